@@ -1,6 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Request, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Form, Query, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -9,14 +10,30 @@ import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict
+from pymongo import ReturnDocument, CursorType
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
 import uuid
 import jwt
 import bcrypt
 from datetime import datetime, timezone, timedelta
 from enum import Enum
 import base64
+import binascii
+import hashlib
+import re
+import tempfile
+import json
+import orjson
 import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import OrderedDict
 import resend
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,18 +48,83 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'campus-store-secret-key-2024')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
+# Realtime events: 'local' fans out in-process, 'mongo' shares events across workers via a capped collection
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'local')
+EVENT_LOG_BYTES = int(os.environ.get('EVENT_LOG_BYTES', str(16 * 1024 * 1024)))
+EVENT_QUEUE_SIZE = 100
+
+# List responses: project trusted DB rows straight into orjson instead of validating them twice
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+# Browse caching: per-college catalog versions drive ETags and an LRU of rendered pages
+CATALOG_VERSION_TTL_SECONDS = float(os.environ.get('CATALOG_VERSION_TTL_SECONDS', '2'))
+CATALOG_PAGE_CACHE_ENTRIES = int(os.environ.get('CATALOG_PAGE_CACHE_ENTRIES', '512'))
+BROWSE_CACHE_CONTROL = "private, no-cache"
+
+# Password hashing
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', '4'))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', '64'))
+
+# Authenticated user cache
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+
 # Stripe Configuration
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', 'sk_test_emergent')
+STRIPE_WEBHOOK_URL = os.environ.get('STRIPE_WEBHOOK_URL', '')
+STRIPE_MODE = os.environ.get('STRIPE_MODE', 'live')  # 'mock' completes checkouts locally without calling Stripe
+STRIPE_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_TIMEOUT_SECONDS', '20'))
+STRIPE_POOL_SIZE = int(os.environ.get('STRIPE_POOL_SIZE', '10'))
+STRIPE_MAX_RETRIES = int(os.environ.get('STRIPE_MAX_RETRIES', '2'))
+# Checkout clients kept for request-derived webhook URLs when STRIPE_WEBHOOK_URL is unset
+STRIPE_MAX_WEBHOOK_URLS = int(os.environ.get('STRIPE_MAX_WEBHOOK_URLS', '8'))
+PAYMENT_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('PAYMENT_RECONCILE_INTERVAL_SECONDS', '60'))
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.environ.get('PAYMENT_RECONCILE_BATCH_SIZE', '50'))
+PAYMENT_STATUS_RECHECK_SECONDS = 10
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_POLL_SECONDS = 5
+WEBHOOK_LOCK_SECONDS = 300
+PAYMENT_STATUS_MAX_WAIT_SECONDS = 25
 
 # Resend Email Configuration
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'resend' if RESEND_API_KEY else 'mock')
+EMAIL_BATCH_SIZE = 100  # Resend batch API limit
+EMAIL_CONCURRENCY = int(os.environ.get('EMAIL_CONCURRENCY', '2'))
+EMAIL_MAX_ATTEMPTS = 6
+EMAIL_POLL_SECONDS = 5
+EMAIL_LOCK_SECONDS = 300
 if RESEND_API_KEY:
     resend.api_key = RESEND_API_KEY
 
 # Create uploads directory
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOADS_URL_PREFIX = "/api/uploads/"
+BASE64_FIELD_PATTERN = re.compile(rb'"image"\s*:\s*"')
+BASE64_FIELD_SCAN_BYTES = 4096
+DATA_URL_SCAN_BYTES = 256
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+# JSON escapes inside the base64 string: \uXXXX, an escape cut off at the end of a piece, or a single-character escape
+JSON_ESCAPE_PATTERN = re.compile(rb'\\(u[0-9a-fA-F]{4}|u[0-9a-fA-F]{0,3}\Z|\Z|.)', re.DOTALL)
+JSON_SIMPLE_ESCAPES = {b'"': b'"', b'\\': b'\\', b'/': b'/', b'b': b'\b', b'f': b'\f', b'n': b'\n', b'r': b'\r', b't': b'\t'}
+NON_BASE64_PATTERN = re.compile(rb'[^A-Za-z0-9+/=]')
+
+# Image derivatives: longest edge in pixels for each WebP variant
+IMAGE_VARIANTS = {"thumb": 200, "card": 480, "full": 1600}
+IMAGE_WEBP_QUALITY = 80
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+
+# Content-addressed blob storage: uploads/<sha[:2]>/<sha[2:4]>/<sha>.<ext>
+BLOB_GC_INTERVAL_SECONDS = int(os.environ.get('BLOB_GC_INTERVAL_SECONDS', '3600'))
+BLOB_GC_GRACE_SECONDS = int(os.environ.get('BLOB_GC_GRACE_SECONDS', str(24 * 3600)))
+BLOB_GC_BATCH_SIZE = 500
+BLOB_URL_PATTERN = re.compile(r"/api/uploads/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.")
 
 app = FastAPI(title="Campus Store API")
 api_router = APIRouter(prefix="/api")
@@ -135,6 +217,7 @@ class UserResponse(BaseModel):
     status: str
     rating: float = 0.0
     total_reviews: int = 0
+    rating_histogram: Dict[str, int] = {}
     created_at: str
     avatar_url: Optional[str] = None
 
@@ -183,6 +266,7 @@ class ItemResponse(BaseModel):
     condition: str
     status: str
     images: List[str] = []
+    image_variants: List[Dict[str, str]] = []
     created_at: str
     updated_at: str
 
@@ -270,11 +354,78 @@ class PaymentStatusResponse(BaseModel):
 
 # ============== AUTH HELPERS ==============
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def password_needs_rehash(hashed: str) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+class PasswordPool:
+    """Bounded thread pool for bcrypt work so it never blocks the event loop (bcrypt releases the GIL)"""
+    def __init__(self, workers: int, queue_limit: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "queued": max(self.pending - self.workers, 0),
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "bcrypt_rounds": BCRYPT_ROUNDS
+        }
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await password_pool.run(verify_password, password, hashed)
+
+async def rehash_password(user_id: str, password: str):
+    """Upgrade a stored hash to the configured cost factor after a successful login"""
+    try:
+        hashed = await hash_password_async(password)
+        await db.users.update_one({"id": user_id}, {"$set": {"password": hashed}})
+        user_cache.invalidate(user_id)
+    except Exception as e:
+        logger.error(f"Failed to rehash password for {user_id}: {e}")
+
+# The event loop only keeps weak references to tasks; hold fire-and-forget rehashes until they finish
+rehash_tasks = set()
+
+def schedule_rehash(user_id: str, password: str):
+    task = asyncio.create_task(rehash_password(user_id, password))
+    rehash_tasks.add(task)
+    task.add_done_callback(rehash_tasks.discard)
+
 def create_token(user_id: str, college_id: str, role: str) -> str:
     payload = {
         "user_id": user_id,
@@ -284,13 +435,73 @@ def create_token(user_id: str, college_id: str, role: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+class UserCache:
+    """Short-TTL LRU of user documents plus a revocation list of accounts suspended by this worker.
+
+    Revocations expire after the same TTL: by then every worker's cached copy of the user has
+    expired too, and the status read from Mongo decides. A restore on another worker therefore
+    takes effect here within the TTL.
+    """
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if not entry:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def set(self, user_id: str, user: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def is_revoked(self, user_id: str) -> bool:
+        expires_at = self._revoked.get(user_id)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._revoked[user_id]
+            return False
+        return True
+
+    def revoke(self, user_id: str):
+        self._revoked[user_id] = time.monotonic() + self.ttl
+        self.invalidate(user_id)
+
+    def restore(self, user_id: str):
+        self._revoked.pop(user_id, None)
+        self.invalidate(user_id)
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+async def authenticate_token(token: str) -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        user_id = payload["user_id"]
+        if user_cache.is_revoked(user_id):
+            raise HTTPException(status_code=403, detail="Account not active")
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_cache.set(user_id, user)
         if user["status"] != UserStatus.ACTIVE.value:
             raise HTTPException(status_code=403, detail="Account not active")
         return user
@@ -299,6 +510,395 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# ============== BATCH LOADERS ==============
+class EntityLoader:
+    """Request-scoped loader that resolves users/items by id with one $in query per collection"""
+    USER_PROJECTION = {"_id": 0, "id": 1, "name": 1, "rating": 1, "avatar_url": 1}
+    ITEM_PROJECTION = {"_id": 0, "id": 1, "title": 1, "images": 1}
+
+    def __init__(self):
+        self._users: Dict[str, Optional[dict]] = {}
+        self._items: Dict[str, Optional[dict]] = {}
+
+    async def _load(self, collection, cache: Dict[str, Optional[dict]], ids, projection: dict):
+        missing = {i for i in ids if i and i not in cache}
+        if missing:
+            docs = await collection.find({"id": {"$in": list(missing)}}, projection).to_list(None)
+            for doc in docs:
+                cache[doc["id"]] = doc
+            for i in missing:
+                cache.setdefault(i, None)
+        return cache
+
+    async def load_users(self, ids) -> Dict[str, Optional[dict]]:
+        return await self._load(db.users, self._users, ids, self.USER_PROJECTION)
+
+    async def load_items(self, ids) -> Dict[str, Optional[dict]]:
+        return await self._load(db.items, self._items, ids, self.ITEM_PROJECTION)
+
+def get_loader() -> EntityLoader:
+    # FastAPI caches dependencies per request, so every Depends(get_loader) shares one instance
+    return EntityLoader()
+
+# ============== INDEXES ==============
+# (collection, keys, options) for every query shape issued by this module
+INDEX_SPECS = [
+    ("colleges", [("id", 1)], {"unique": True}),
+    ("colleges", [("is_active", 1)], {}),
+    ("users", [("id", 1)], {"unique": True}),
+    ("users", [("email", 1)], {"unique": True}),
+    ("items", [("id", 1)], {"unique": True}),
+    ("items", [("college_id", 1), ("status", 1), ("created_at", -1), ("id", -1)], {}),
+    ("items", [("owner_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("items", [("college_id", 1), ("status", 1), ("price_buy", 1)], {}),
+    ("items", [("college_id", 1), ("status", 1), ("price_borrow", 1)], {}),
+    ("items", [("college_id", 1), ("status", 1), ("effective_prices", 1)], {}),
+    # Per-college full-text index: stemmed, stop-word filtered, title weighted over description
+    ("items", [("college_id", 1), ("title", "text"), ("description", "text")],
+     {"name": "items_text", "weights": {"title": 3, "description": 1}, "default_language": "english"}),
+    ("orders", [("id", 1)], {"unique": True}),
+    ("orders", [("buyer_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("orders", [("seller_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("orders", [("buyer_id", 1), ("status", 1)], {}),
+    ("orders", [("seller_id", 1), ("status", 1)], {}),
+    ("borrow_requests", [("id", 1)], {"unique": True}),
+    ("borrow_requests", [("borrower_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("borrow_requests", [("lender_id", 1), ("created_at", -1), ("id", -1)], {}),
+    ("borrow_requests", [("lender_id", 1), ("status", 1), ("created_at", -1)], {}),
+    ("borrow_requests", [("borrower_id", 1), ("status", 1)], {}),
+    ("reviews", [("id", 1)], {"unique": True}),
+    ("reviews", [("reviewee_id", 1), ("created_at", -1)], {}),
+    ("reviews", [("reviewer_id", 1), ("order_id", 1)], {}),
+    ("reviews", [("reviewer_id", 1), ("borrow_id", 1)], {}),
+    ("payment_transactions", [("id", 1)], {"unique": True}),
+    ("payment_transactions", [("session_id", 1)], {"unique": True}),
+    ("payment_transactions", [("payment_status", 1), ("checked_at", 1)], {}),
+    ("email_outbox", [("id", 1)], {"unique": True}),
+    ("email_outbox", [("status", 1), ("next_attempt_at", 1)], {}),
+    ("email_outbox", [("claim_id", 1)], {}),
+    ("blobs", [("hash", 1)], {"unique": True}),
+    ("blobs", [("refcount", 1), ("last_uploaded_at", 1)], {}),
+    ("items", [("blob_refs", 1)], {}),
+    ("users", [("avatar_blob", 1)], {}),
+    ("webhook_events", [("event_id", 1)], {"unique": True}),
+    ("webhook_events", [("status", 1), ("next_attempt_at", 1)], {}),
+    ("user_stats", [("user_id", 1)], {"unique": True}),
+    ("catalog_versions", [("college_id", 1)], {"unique": True}),
+    ("conversations", [("id", 1)], {"unique": True}),
+    ("conversations", [("participant_ids", 1), ("last_message_at", -1)], {}),
+    ("conversations", [("participant_ids", 1), ("item_id", 1)], {}),
+    ("messages", [("id", 1)], {"unique": True}),
+    ("messages", [("conversation_id", 1), ("created_at", 1)], {}),
+    ("messages", [("conversation_id", 1), ("receiver_id", 1), ("read", 1)], {}),
+    ("messages", [("receiver_id", 1), ("read", 1)], {}),
+]
+
+# (collection, filter, sort) samples of the hot query shapes, checked by the advisor
+QUERY_SHAPES = [
+    ("users", {"id": "x"}, None),
+    ("users", {"email": "x"}, None),
+    ("items", {"college_id": "x", "status": {"$in": [ItemStatus.AVAILABLE.value, ItemStatus.RENTED.value]}}, [("created_at", -1)]),
+    ("items", {"owner_id": "x"}, [("created_at", -1)]),
+    ("items", {"college_id": "x", "status": ItemStatus.AVAILABLE.value, "effective_prices": {"$elemMatch": {"$gte": 0, "$lte": 10}}}, None),
+    ("items", {"college_id": "x", "$text": {"$search": "x"}}, None),
+    ("orders", {"buyer_id": "x"}, [("created_at", -1)]),
+    ("orders", {"seller_id": "x", "status": OrderStatus.COMPLETED.value}, None),
+    ("borrow_requests", {"lender_id": "x", "status": BorrowStatus.REQUESTED.value}, [("created_at", -1)]),
+    ("borrow_requests", {"borrower_id": "x"}, [("created_at", -1)]),
+    ("reviews", {"reviewee_id": "x"}, [("created_at", -1)]),
+    ("payment_transactions", {"session_id": "x"}, None),
+    ("conversations", {"participant_ids": "x"}, [("last_message_at", -1)]),
+    ("messages", {"conversation_id": "x"}, [("created_at", 1)]),
+    ("messages", {"conversation_id": "x", "receiver_id": "x", "read": False}, None),
+    ("messages", {"receiver_id": "x", "read": False}, None),
+]
+
+INDEX_ADVISOR = os.environ.get('INDEX_ADVISOR', '').lower() in ('1', 'true', 'yes')
+
+async def ensure_indexes():
+    """Build every declared index; create_index is a no-op when the index already exists"""
+    for collection, keys, options in INDEX_SPECS:
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            logger.error(f"Failed to create index {collection} {keys}: {e}")
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            yield from _plan_stages(child)
+
+async def run_index_advisor() -> List[dict]:
+    """Explain each registered query shape and report those that fall back to a COLLSCAN"""
+    report = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain()).get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_stages(plan))
+        if "COLLSCAN" in stages:
+            logger.warning(f"[INDEX ADVISOR] COLLSCAN on {collection} for {query} sort={sort}")
+        report.append({"collection": collection, "query": str(query), "stages": stages})
+    return report
+
+# ============== PAGINATION ==============
+# Lists are keyset-paginated on (created_at, id), search by relevance by offset; the next page's cursor is returned in this header
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PAGE_SORT = [("created_at", -1), ("id", -1)]
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"], doc["id"]]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, doc_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Anything but strings (e.g. {"$ne": null}) would be read as query operators
+    if not isinstance(created_at, str) or not isinstance(doc_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": doc_id}}
+    ]}
+
+def encode_offset_cursor(offset: int) -> str:
+    raw = json.dumps([offset]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        (offset,) = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+async def fetch_ranked_page(collection, query: dict, response: Response, limit: int, sort: list, cursor: Optional[str] = None, projection: Optional[dict] = None) -> List[dict]:
+    """Fetch one page of an order with no stable keyset (text relevance) by offset; rows may shift between pages"""
+    offset = decode_offset_cursor(cursor) if cursor else 0
+    docs = await collection.find(query, projection or {"_id": 0}).sort(sort).skip(offset).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_offset_cursor(offset + limit)
+    return docs
+
+async def fetch_page(collection, query: dict, response: Response, limit: int, cursor: Optional[str] = None, projection: Optional[dict] = None) -> List[dict]:
+    """Fetch one page newest-first, setting the next-page cursor header when more rows remain"""
+    if cursor:
+        after = decode_cursor(cursor)
+        query = {"$and": [query, after]} if "$or" in query else {**query, **after}
+    docs = await collection.find(query, projection or {"_id": 0}).sort(PAGE_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1])
+    return docs
+
+# ============== RESPONSE SERIALIZATION ==============
+# With FAST_RESPONSES on, list handlers return a pre-encoded body so FastAPI skips response_model validation
+RESPONSE_DEFAULTS: Dict[type, dict] = {}
+
+def response_defaults(model: type) -> dict:
+    """Field name -> default for a response model; required fields fall back to None"""
+    defaults = RESPONSE_DEFAULTS.get(model)
+    if defaults is None:
+        defaults = {
+            name: None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+        }
+        RESPONSE_DEFAULTS[model] = defaults
+    return defaults
+
+def project_row(model: type, doc: dict) -> dict:
+    """Copy exactly the model's fields out of a trusted DB document, without validation"""
+    return {name: doc.get(name, default) for name, default in response_defaults(model).items()}
+
+def render_rows(model: type, rows: List[dict], response: Optional[Response] = None):
+    """Build list responses as models, or as one orjson body when FAST_RESPONSES is enabled"""
+    if not FAST_RESPONSES:
+        return [model(**row) for row in rows]
+    fast = ORJSONResponse([project_row(model, row) for row in rows])
+    if response is not None:
+        # Returning a Response bypasses the injected one, so carry over headers such as the next cursor
+        fast.raw_headers.extend(
+            (key, value) for key, value in response.raw_headers
+            if key not in (b"content-length", b"content-type")
+        )
+    return fast
+
+def encode_rows(model: type, rows: List[dict]) -> bytes:
+    """Encode a list response to bytes once so it can be cached; honours FAST_RESPONSES like render_rows"""
+    if FAST_RESPONSES:
+        return orjson.dumps([project_row(model, row) for row in rows])
+    return json.dumps(
+        [model(**row).model_dump(mode="json") for row in rows],
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+# ============== CATALOG CACHE ==============
+class CatalogCache:
+    """Per-college catalog version counters plus a bounded LRU of rendered browse pages
+
+    Versions live in Mongo so every worker derives the same ETag for the same catalog state;
+    each worker trusts its copy for CATALOG_VERSION_TTL_SECONDS, so bumps made by another
+    worker are picked up within that window.
+    """
+    def __init__(self, version_ttl: float, max_pages: int):
+        self.version_ttl = version_ttl
+        self.max_pages = max_pages
+        self._versions: Dict[str, tuple] = {}
+        self._pages: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def version(self, college_id: str) -> int:
+        entry = self._versions.get(college_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        doc = await db.catalog_versions.find_one({"college_id": college_id}, {"_id": 0, "version": 1})
+        version = doc["version"] if doc else 0
+        self._versions[college_id] = (time.monotonic() + self.version_ttl, version)
+        return version
+
+    async def bump(self, college_id: str):
+        """Invalidate every cached browse page of a college by moving it to a new version"""
+        doc = await db.catalog_versions.find_one_and_update(
+            {"college_id": college_id},
+            {"$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._versions[college_id] = (time.monotonic() + self.version_ttl, doc["version"])
+
+    async def lookup(self, request: Request, college_id: str) -> tuple:
+        """Return (etag, response) where response is a 304 or a replayed page, or None on a miss"""
+        version = await self.version(college_id)
+        params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+        raw = f"{college_id}:{version}:{request.url.path}?{params}"
+        etag = f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+        
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return etag, Response(status_code=304, headers={"ETag": etag, "Cache-Control": BROWSE_CACHE_CONTROL})
+        
+        page = self._pages.get(etag)
+        if page is None:
+            return etag, None
+        self._pages.move_to_end(etag)
+        body, headers = page
+        return etag, Response(body, media_type="application/json", headers=headers)
+
+    def store(self, etag: str, model: type, rows: List[dict], response: Optional[Response] = None) -> Response:
+        """Render a browse page, remember it under its ETag and return it"""
+        headers = {"ETag": etag, "Cache-Control": BROWSE_CACHE_CONTROL}
+        next_cursor = response.headers.get(NEXT_CURSOR_HEADER) if response is not None else None
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+        body = encode_rows(model, rows)
+        self._pages[etag] = (body, headers)
+        self._pages.move_to_end(etag)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return Response(body, media_type="application/json", headers=headers)
+
+catalog_cache = CatalogCache(CATALOG_VERSION_TTL_SECONDS, CATALOG_PAGE_CACHE_ENTRIES)
+
+# ============== REALTIME EVENTS ==============
+class EventHub:
+    """Fans events out to each user's open sockets, optionally through a shared Mongo broker"""
+    def __init__(self, broker: str):
+        self.broker = broker
+        self._subscribers: Dict[str, set] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def deliver(self, user_id: str, event: dict):
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning(f"Dropping {event['type']} event for slow consumer {user_id}")
+
+    async def publish(self, user_id: str, event_type: str, data: dict):
+        event = {"type": event_type, "data": data, "created_at": datetime.now(timezone.utc).isoformat()}
+        if self.broker == "mongo":
+            await db.events.insert_one({"user_id": user_id, "event": event})
+        else:
+            self.deliver(user_id, event)
+
+    async def start(self):
+        if self.broker != "mongo":
+            return
+        try:
+            await db.create_collection("events", capped=True, size=EVENT_LOG_BYTES)
+        except CollectionInvalid:
+            pass
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+
+    async def _listen(self):
+        last = await db.events.find_one({}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = db.events.find(query, {"user_id": 1, "event": 1}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for doc in cursor:
+                    last_id = doc["_id"]
+                    self.deliver(doc["user_id"], doc["event"])
+            except Exception as e:
+                logger.error(f"Event listener error: {e}")
+            # Tailable cursors die on an empty collection; back off before re-tailing
+            await asyncio.sleep(1)
+
+event_hub = EventHub(EVENT_BROKER)
+
+@api_router.websocket("/ws")
+async def events_socket(websocket: WebSocket, token: str):
+    """Push channel for message, borrow and payment events (browsers cannot send auth headers here)"""
+    try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    queue = event_hub.subscribe(user["id"])
+    
+    async def pump():
+        while True:
+            await websocket.send_json(await queue.get())
+    
+    pump_task = asyncio.create_task(pump())
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pump_task.cancel()
+        event_hub.unsubscribe(user["id"], queue)
+
 # ============== COLLEGE ENDPOINTS ==============
 @api_router.get("/colleges", response_model=List[College])
 async def get_colleges():
@@ -328,29 +928,35 @@ async def signup(user: UserCreate):
     user_doc = {
         "id": user_id,
         "email": user.email,
-        "password": hash_password(user.password),
+        "password": await hash_password_async(user.password),
         "name": user.name,
         "phone": user.phone,
         "college_id": user.college_id,
         "role": UserRole.STUDENT.value,
         "status": UserStatus.ACTIVE.value,  # Auto-approve for MVP
         "rating": 0.0,
+        "rating_sum": 0,
         "total_reviews": 0,
+        "rating_histogram": {},
         "avatar_url": f"https://api.dicebear.com/7.x/avataaars/svg?seed={user_id}",
         "student_id_image": user.student_id_image,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same email
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     token = create_token(user_id, user.college_id, UserRole.STUDENT.value)
     
-    # Send welcome email (async, non-blocking)
-    asyncio.create_task(send_email_async(
+    # Queue welcome email
+    await email_outbox.enqueue(
         user.email,
         "Welcome to Campus Store!",
         get_welcome_email_html(user.name, college["name"])
-    ))
+    )
     
     return {
         "token": token,
@@ -375,12 +981,15 @@ async def login(credentials: UserLogin):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user["password"]):
+    if not await verify_password_async(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if user["status"] != UserStatus.ACTIVE.value:
         raise HTTPException(status_code=403, detail="Account not active")
     
+    if password_needs_rehash(user["password"]):
+        schedule_rehash(user["id"], credentials.password)
+    
     college = await db.colleges.find_one({"id": user["college_id"]}, {"_id": 0})
     
     token = create_token(user["id"], user["college_id"], user["role"])
@@ -417,6 +1026,7 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         status=current_user["status"],
         rating=current_user.get("rating", 0.0),
         total_reviews=current_user.get("total_reviews", 0),
+        rating_histogram=current_user.get("rating_histogram", {}),
         avatar_url=current_user.get("avatar_url"),
         created_at=current_user["created_at"]
     )
@@ -424,8 +1034,16 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 @api_router.put("/auth/profile", response_model=UserResponse)
 async def update_profile(update: UserUpdate, current_user: dict = Depends(get_current_user)):
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if "avatar_url" in update_data:
+        avatar_blobs = blob_hashes([update_data["avatar_url"]])
+        update_data["avatar_blob"] = avatar_blobs[0] if avatar_blobs else None
+        await update_blob_refs([current_user.get("avatar_url") or ""], [update_data["avatar_url"]])
     if update_data:
         await db.users.update_one({"id": current_user["id"]}, {"$set": update_data})
+        user_cache.invalidate(current_user["id"])
+    if "name" in update_data:
+        # Browse pages show the owner's name
+        await catalog_cache.bump(current_user["college_id"])
     
     user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0})
     college = await db.colleges.find_one({"id": user["college_id"]}, {"_id": 0})
@@ -441,11 +1059,36 @@ async def update_profile(update: UserUpdate, current_user: dict = Depends(get_cu
         status=user["status"],
         rating=user.get("rating", 0.0),
         total_reviews=user.get("total_reviews", 0),
+        rating_histogram=user.get("rating_histogram", {}),
         avatar_url=user.get("avatar_url"),
         created_at=user["created_at"]
     )
 
 # ============== ITEM ENDPOINTS ==============
+def effective_prices(mode: str, price_buy: Optional[float], price_borrow: Optional[float]) -> List[float]:
+    """Prices an item is actually offered at, stored so price-range filters are index scans"""
+    prices = []
+    if mode != ItemMode.BORROW.value and price_buy is not None:
+        prices.append(float(price_buy))
+    if mode != ItemMode.BUY.value and price_borrow is not None:
+        prices.append(float(price_borrow))
+    return prices
+
+async def backfill_effective_prices():
+    """Populate effective_prices on items created before the field existed"""
+    def offered(excluded_mode: str, field: str) -> dict:
+        return {"$cond": [
+            {"$and": [{"$ne": ["$mode", excluded_mode]}, {"$ne": [{"$ifNull": [field, None]}, None]}]},
+            [field], []
+        ]}
+    await db.items.update_many(
+        {"effective_prices": {"$exists": False}},
+        [{"$set": {"effective_prices": {"$concatArrays": [
+            offered(ItemMode.BORROW.value, "$price_buy"),
+            offered(ItemMode.BUY.value, "$price_borrow")
+        ]}}}]
+    )
+
 @api_router.post("/items", response_model=ItemResponse)
 async def create_item(item: ItemCreate, current_user: dict = Depends(get_current_user)):
     item_id = str(uuid.uuid4())
@@ -465,11 +1108,17 @@ async def create_item(item: ItemCreate, current_user: dict = Depends(get_current
         "condition": item.condition.value,
         "status": ItemStatus.AVAILABLE.value,
         "images": item.images,
+        "image_variants": image_variants_for(item.images),
+        "blob_refs": blob_hashes(item.images),
+        "effective_prices": effective_prices(item.mode.value, item.price_buy, item.price_borrow),
         "created_at": now,
         "updated_at": now
     }
     
     await db.items.insert_one(item_doc)
+    await update_blob_refs([], item.images)
+    await bump_stats(current_user["id"], items_listed=1)
+    await catalog_cache.bump(current_user["college_id"])
     
     return ItemResponse(
         **{k: v for k, v in item_doc.items()},
@@ -479,14 +1128,24 @@ async def create_item(item: ItemCreate, current_user: dict = Depends(get_current
 
 @api_router.get("/items", response_model=List[ItemResponse])
 async def get_items(
+    request: Request,
+    response: Response,
     mode: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     condition: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    sort: Optional[str] = "newest",
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    loader: EntityLoader = Depends(get_loader)
 ):
+    etag, cached = await catalog_cache.lookup(request, current_user["college_id"])
+    if cached:
+        return cached
+    
     # Filter by college (multi-tenancy)
     query = {
         "college_id": current_user["college_id"],
@@ -505,38 +1164,62 @@ async def get_items(
     if condition:
         query["condition"] = condition
     
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+    if min_price is not None or max_price is not None:
+        bounds = {}
+        if min_price is not None:
+            bounds["$gte"] = min_price
+        if max_price is not None:
+            bounds["$lte"] = max_price
+        if mode == "buy":
+            query["price_buy"] = bounds
+        elif mode == "borrow":
+            query["price_borrow"] = bounds
+        else:
+            query["effective_prices"] = {"$elemMatch": bounds}
     
-    items = await db.items.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    projection = {"_id": 0}
+    if search:
+        # Served by the per-college text index; textScore ranks by term frequency and field weight
+        query["$text"] = {"$search": search}
+        projection["score"] = {"$meta": "textScore"}
+    
+    if search and sort == "relevance":
+        # Relevance order has no stable keyset, so it pages by offset with its own cursor format;
+        # a keyset cursor is rejected here, and an offset cursor by fetch_page
+        items = await fetch_ranked_page(
+            db.items, query, response, limit,
+            [("score", {"$meta": "textScore"}), ("created_at", -1), ("id", -1)], cursor, projection
+        )
+    else:
+        items = await fetch_page(db.items, query, response, limit, cursor, projection)
     
     # Enrich with owner info
-    result = []
+    owners = await loader.load_users(item["owner_id"] for item in items)
+    rows = []
     for item in items:
-        owner = await db.users.find_one({"id": item["owner_id"]}, {"_id": 0, "name": 1, "rating": 1})
-        result.append(ItemResponse(
+        owner = owners.get(item["owner_id"])
+        rows.append({
             **item,
-            owner_name=owner["name"] if owner else "Unknown",
-            owner_rating=owner.get("rating", 0.0) if owner else 0.0
-        ))
+            "owner_name": owner["name"] if owner else "Unknown",
+            "owner_rating": owner.get("rating", 0.0) if owner else 0.0
+        })
     
-    return result
+    return catalog_cache.store(etag, ItemResponse, rows, response)
 
 @api_router.get("/items/my", response_model=List[ItemResponse])
-async def get_my_items(current_user: dict = Depends(get_current_user)):
-    items = await db.items.find(
-        {"owner_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
+async def get_my_items(
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    items = await fetch_page(db.items, {"owner_id": current_user["id"]}, response, limit, cursor)
     
-    return [ItemResponse(
+    return render_rows(ItemResponse, [{
         **item,
-        owner_name=current_user["name"],
-        owner_rating=current_user.get("rating", 0.0)
-    ) for item in items]
+        "owner_name": current_user["name"],
+        "owner_rating": current_user.get("rating", 0.0)
+    } for item in items], response)
 
 @api_router.get("/items/{item_id}", response_model=ItemResponse)
 async def get_item(item_id: str, current_user: dict = Depends(get_current_user)):
@@ -567,8 +1250,16 @@ async def update_item(item_id: str, update: ItemUpdate, current_user: dict = Dep
     
     update_data = {k: v.value if isinstance(v, Enum) else v for k, v in update.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    if "images" in update_data:
+        update_data["image_variants"] = image_variants_for(update_data["images"])
+        update_data["blob_refs"] = blob_hashes(update_data["images"])
+        await update_blob_refs(item.get("images", []), update_data["images"])
+    if {"mode", "price_buy", "price_borrow"} & update_data.keys():
+        merged = {**item, **update_data}
+        update_data["effective_prices"] = effective_prices(merged["mode"], merged.get("price_buy"), merged.get("price_borrow"))
     
     await db.items.update_one({"id": item_id}, {"$set": update_data})
+    await catalog_cache.bump(item["college_id"])
     
     updated_item = await db.items.find_one({"id": item_id}, {"_id": 0})
     return ItemResponse(
@@ -587,6 +1278,9 @@ async def delete_item(item_id: str, current_user: dict = Depends(get_current_use
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.items.delete_one({"id": item_id})
+    await catalog_cache.bump(item["college_id"])
+    await update_blob_refs(item.get("images", []), [])
+    await bump_stats(current_user["id"], items_listed=-1)
     return {"message": "Item deleted"}
 
 # ============== CATEGORIES ==============
@@ -601,8 +1295,16 @@ CATEGORIES = [
     {"id": "other", "name": "Other", "icon": "package"}
 ]
 
+# Categories are static, so their ETag only changes when the list above does
+CATEGORIES_ETAG = f'"{hashlib.sha256(json.dumps(CATEGORIES).encode()).hexdigest()[:32]}"'
+
 @api_router.get("/categories")
-async def get_categories():
+async def get_categories(request: Request, response: Response):
+    headers = {"ETag": CATEGORIES_ETAG, "Cache-Control": "public, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, CATEGORIES_ETAG):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return CATEGORIES
 
 # ============== BUY (ORDER) ENDPOINTS ==============
@@ -651,26 +1353,35 @@ async def create_order(order: OrderCreate, current_user: dict = Depends(get_curr
     )
 
 @api_router.get("/orders", response_model=List[OrderResponse])
-async def get_orders(type: Optional[str] = "bought", current_user: dict = Depends(get_current_user)):
+async def get_orders(
+    response: Response,
+    type: Optional[str] = "bought",
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    loader: EntityLoader = Depends(get_loader)
+):
     if type == "sold":
         query = {"seller_id": current_user["id"]}
     else:
         query = {"buyer_id": current_user["id"]}
     
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    orders = await fetch_page(db.orders, query, response, limit, cursor)
     
-    result = []
+    items = await loader.load_items(o["item_id"] for o in orders)
+    sellers = await loader.load_users(o["seller_id"] for o in orders)
+    rows = []
     for order in orders:
-        item = await db.items.find_one({"id": order["item_id"]}, {"_id": 0})
-        seller = await db.users.find_one({"id": order["seller_id"]}, {"_id": 0, "name": 1})
-        result.append(OrderResponse(
+        item = items.get(order["item_id"])
+        seller = sellers.get(order["seller_id"])
+        rows.append({
             **order,
-            item_title=item["title"] if item else "Unknown",
-            item_image=item["images"][0] if item and item["images"] else None,
-            seller_name=seller["name"] if seller else "Unknown"
-        ))
+            "item_title": item["title"] if item else "Unknown",
+            "item_image": item["images"][0] if item and item["images"] else None,
+            "seller_name": seller["name"] if seller else "Unknown"
+        })
     
-    return result
+    return render_rows(OrderResponse, rows, response)
 
 @api_router.get("/orders/{order_id}", response_model=OrderResponse)
 async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
@@ -703,23 +1414,37 @@ async def complete_order(order_id: str, current_user: dict = Depends(get_current
     if order["payment_status"] != PaymentStatus.PAID.value:
         raise HTTPException(status_code=400, detail="Payment not completed")
     
-    await db.orders.update_one(
-        {"id": order_id},
+    result = await db.orders.update_one(
+        {"id": order_id, "status": {"$ne": OrderStatus.COMPLETED.value}},
         {"$set": {
             "status": OrderStatus.COMPLETED.value,
             "completed_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    if result.modified_count:
+        await bump_stats(order["buyer_id"], items_bought=1)
+        await bump_stats(order["seller_id"], items_sold=1, sales_earnings=order["amount"])
     
     # Mark item as sold
     await db.items.update_one(
         {"id": order["item_id"]},
         {"$set": {"status": ItemStatus.SOLD.value}}
     )
+    await catalog_cache.bump(order["college_id"])
     
     return {"message": "Order completed"}
 
 # ============== BORROW ENDPOINTS ==============
+def calculate_borrow_amounts(start_date: str, end_date: str, price_borrow: float, deposit: Optional[float]) -> tuple:
+    """Return (days, rental_amount, deposit_amount) for a rental period; at least one day is charged"""
+    start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+    end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+    days = max((end - start).days, 1)
+    
+    rental_amount = float(price_borrow) * days
+    deposit_amount = float(deposit) if deposit else 0.0
+    return days, rental_amount, deposit_amount
+
 @api_router.post("/borrow", response_model=BorrowRequestResponse)
 async def create_borrow_request(request: BorrowRequestCreate, current_user: dict = Depends(get_current_user)):
     item = await db.items.find_one({"id": request.item_id}, {"_id": 0})
@@ -738,13 +1463,9 @@ async def create_borrow_request(request: BorrowRequestCreate, current_user: dict
     if item["owner_id"] == current_user["id"]:
         raise HTTPException(status_code=400, detail="Cannot borrow your own item")
     
-    # Calculate rental period and amounts
-    start = datetime.fromisoformat(request.start_date.replace('Z', '+00:00'))
-    end = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
-    days = max((end - start).days, 1)
-    
-    rental_amount = float(item["price_borrow"]) * days
-    deposit_amount = float(item["deposit"]) if item["deposit"] else 0.0
+    days, rental_amount, deposit_amount = calculate_borrow_amounts(
+        request.start_date, request.end_date, item["price_borrow"], item["deposit"]
+    )
     
     borrow_id = str(uuid.uuid4())
     borrow_doc = {
@@ -772,7 +1493,7 @@ async def create_borrow_request(request: BorrowRequestCreate, current_user: dict
     
     # Send email notification to lender
     if lender and lender.get("email"):
-        asyncio.create_task(send_email_async(
+        await email_outbox.enqueue(
             lender["email"],
             f"New Borrow Request for {item['title']}",
             get_borrow_request_email_html(
@@ -782,61 +1503,74 @@ async def create_borrow_request(request: BorrowRequestCreate, current_user: dict
                 days,
                 rental_amount + deposit_amount
             )
-        ))
+        )
     
-    return BorrowRequestResponse(
+    response = BorrowRequestResponse(
         **borrow_doc,
         item_title=item["title"],
         item_image=item["images"][0] if item["images"] else None,
         borrower_name=current_user["name"],
         lender_name=lender["name"] if lender else "Unknown"
     )
+    await event_hub.publish(item["owner_id"], "borrow.requested", response.model_dump())
+    return response
 
 @api_router.get("/borrow", response_model=List[BorrowRequestResponse])
-async def get_borrow_requests(type: Optional[str] = "borrowed", current_user: dict = Depends(get_current_user)):
+async def get_borrow_requests(
+    response: Response,
+    type: Optional[str] = "borrowed",
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    loader: EntityLoader = Depends(get_loader)
+):
     if type == "lent":
         query = {"lender_id": current_user["id"]}
     else:
         query = {"borrower_id": current_user["id"]}
     
-    borrows = await db.borrow_requests.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    borrows = await fetch_page(db.borrow_requests, query, response, limit, cursor)
     
-    result = []
+    items = await loader.load_items(b["item_id"] for b in borrows)
+    users = await loader.load_users([b["borrower_id"] for b in borrows] + [b["lender_id"] for b in borrows])
+    rows = []
     for borrow in borrows:
-        item = await db.items.find_one({"id": borrow["item_id"]}, {"_id": 0})
-        borrower = await db.users.find_one({"id": borrow["borrower_id"]}, {"_id": 0, "name": 1})
-        lender = await db.users.find_one({"id": borrow["lender_id"]}, {"_id": 0, "name": 1})
-        result.append(BorrowRequestResponse(
+        item = items.get(borrow["item_id"])
+        borrower = users.get(borrow["borrower_id"])
+        lender = users.get(borrow["lender_id"])
+        rows.append({
             **borrow,
-            item_title=item["title"] if item else "Unknown",
-            item_image=item["images"][0] if item and item["images"] else None,
-            borrower_name=borrower["name"] if borrower else "Unknown",
-            lender_name=lender["name"] if lender else "Unknown"
-        ))
+            "item_title": item["title"] if item else "Unknown",
+            "item_image": item["images"][0] if item and item["images"] else None,
+            "borrower_name": borrower["name"] if borrower else "Unknown",
+            "lender_name": lender["name"] if lender else "Unknown"
+        })
     
-    return result
+    return render_rows(BorrowRequestResponse, rows, response)
 
 @api_router.get("/borrow/pending", response_model=List[BorrowRequestResponse])
-async def get_pending_requests(current_user: dict = Depends(get_current_user)):
+async def get_pending_requests(current_user: dict = Depends(get_current_user), loader: EntityLoader = Depends(get_loader)):
     """Get pending borrow requests for items owned by current user (lender view)"""
     borrows = await db.borrow_requests.find(
         {"lender_id": current_user["id"], "status": BorrowStatus.REQUESTED.value},
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
-    result = []
+    items = await loader.load_items(b["item_id"] for b in borrows)
+    borrowers = await loader.load_users(b["borrower_id"] for b in borrows)
+    rows = []
     for borrow in borrows:
-        item = await db.items.find_one({"id": borrow["item_id"]}, {"_id": 0})
-        borrower = await db.users.find_one({"id": borrow["borrower_id"]}, {"_id": 0, "name": 1})
-        result.append(BorrowRequestResponse(
+        item = items.get(borrow["item_id"])
+        borrower = borrowers.get(borrow["borrower_id"])
+        rows.append({
             **borrow,
-            item_title=item["title"] if item else "Unknown",
-            item_image=item["images"][0] if item and item["images"] else None,
-            borrower_name=borrower["name"] if borrower else "Unknown",
-            lender_name=current_user["name"]
-        ))
+            "item_title": item["title"] if item else "Unknown",
+            "item_image": item["images"][0] if item and item["images"] else None,
+            "borrower_name": borrower["name"] if borrower else "Unknown",
+            "lender_name": current_user["name"]
+        })
     
-    return result
+    return render_rows(BorrowRequestResponse, rows)
 
 @api_router.get("/borrow/{borrow_id}", response_model=BorrowRequestResponse)
 async def get_borrow_request(borrow_id: str, current_user: dict = Depends(get_current_user)):
@@ -883,7 +1617,7 @@ async def approve_borrow_request(borrow_id: str, approval: BorrowApproval, curre
         
         # Send approval email to borrower
         if borrower and borrower.get("email"):
-            asyncio.create_task(send_email_async(
+            await email_outbox.enqueue(
                 borrower["email"],
                 f"Your Borrow Request Approved - {item['title'] if item else 'Item'}",
                 get_borrow_approved_email_html(
@@ -892,8 +1626,9 @@ async def approve_borrow_request(borrow_id: str, approval: BorrowApproval, curre
                     current_user["name"],
                     borrow["total_amount"]
                 )
-            ))
+            )
         
+        await event_hub.publish(borrow["borrower_id"], "borrow.approved", {"borrow_id": borrow_id})
         return {"message": "Request approved"}
     else:
         await db.borrow_requests.update_one(
@@ -903,6 +1638,10 @@ async def approve_borrow_request(borrow_id: str, approval: BorrowApproval, curre
                 "rejection_reason": approval.rejection_reason
             }}
         )
+        await event_hub.publish(borrow["borrower_id"], "borrow.rejected", {
+            "borrow_id": borrow_id,
+            "rejection_reason": approval.rejection_reason
+        })
         return {"message": "Request rejected"}
 
 @api_router.post("/borrow/{borrow_id}/return")
@@ -917,19 +1656,24 @@ async def return_item(borrow_id: str, current_user: dict = Depends(get_current_u
     if borrow["status"] != BorrowStatus.ACTIVE.value:
         raise HTTPException(status_code=400, detail="Rental not active")
     
-    await db.borrow_requests.update_one(
-        {"id": borrow_id},
+    result = await db.borrow_requests.update_one(
+        {"id": borrow_id, "status": BorrowStatus.ACTIVE.value},
         {"$set": {
             "status": BorrowStatus.RETURNED.value,
             "returned_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    if result.modified_count:
+        # Dashboard counts active and closed rentals, so a returned one drops out until confirmed
+        await bump_stats(borrow["borrower_id"], items_borrowed=-1)
+        await bump_stats(borrow["lender_id"], items_lent=-1)
     
     # Make item available again
     await db.items.update_one(
         {"id": borrow["item_id"]},
         {"$set": {"status": ItemStatus.AVAILABLE.value}}
     )
+    await catalog_cache.bump(borrow["college_id"])
     
     return {"message": "Item returned"}
 
@@ -946,21 +1690,130 @@ async def confirm_return(borrow_id: str, current_user: dict = Depends(get_curren
     if borrow["status"] != BorrowStatus.RETURNED.value:
         raise HTTPException(status_code=400, detail="Item not returned yet")
     
-    await db.borrow_requests.update_one(
-        {"id": borrow_id},
+    result = await db.borrow_requests.update_one(
+        {"id": borrow_id, "status": BorrowStatus.RETURNED.value},
         {"$set": {
             "status": BorrowStatus.CLOSED.value,
             "payment_status": PaymentStatus.REFUNDED.value
         }}
     )
+    if result.modified_count:
+        await bump_stats(borrow["borrower_id"], items_borrowed=1)
+        await bump_stats(borrow["lender_id"], items_lent=1, rental_earnings=borrow["rental_amount"])
     
     return {"message": "Return confirmed, deposit refunded"}
 
+# ============== PAYMENT CLIENT ==============
+class MockCheckoutSessionRequest(BaseModel):
+    amount: float
+    currency: str
+    success_url: str
+    cancel_url: str
+    metadata: Dict[str, str] = {}
+
+class MockCheckoutSession(BaseModel):
+    url: str
+    session_id: str
+
+class MockCheckoutStatus(BaseModel):
+    status: str
+    payment_status: str
+    amount_total: Optional[int] = None
+    currency: Optional[str] = None
+    metadata: Dict[str, str] = {}
+
+class MockStripeCheckout:
+    """Offline stand-in for StripeCheckout: sessions live in memory and report paid on the first status check"""
+    def __init__(self):
+        self.sessions: Dict[str, MockCheckoutSessionRequest] = {}
+
+    async def create_checkout_session(self, request: MockCheckoutSessionRequest) -> MockCheckoutSession:
+        session_id = f"cs_mock_{uuid.uuid4().hex}"
+        self.sessions[session_id] = request
+        return MockCheckoutSession(url=request.success_url.replace("{CHECKOUT_SESSION_ID}", session_id), session_id=session_id)
+
+    async def get_checkout_status(self, session_id: str) -> MockCheckoutStatus:
+        # Sessions created by another worker are unknown here but still settle, just without an amount
+        request = self.sessions.get(session_id)
+        return MockCheckoutStatus(
+            status="complete",
+            payment_status="paid",
+            amount_total=round(request.amount * 100) if request else None,
+            currency=request.currency if request else None,
+            metadata=request.metadata if request else {}
+        )
+
+    async def handle_webhook(self, body: bytes, signature: Optional[str]):
+        raise ValueError("Stripe webhooks are not accepted in mock mode")
+
+class PaymentClient:
+    """Process-wide Stripe checkout clients, created at startup with a pooled keep-alive HTTP session.
+
+    Checkout sessions carry a webhook URL. Without STRIPE_WEBHOOK_URL it comes from the request host,
+    so a small LRU keeps one client per URL; status checks and webhook verification use `checkout`.
+    """
+    def __init__(self, max_webhook_urls: int):
+        self.max_webhook_urls = max_webhook_urls
+        self.checkout = None
+        self.session_request_cls = None
+        self._checkout_cls = None
+        self._by_webhook_url: "OrderedDict[str, object]" = OrderedDict()
+
+    @property
+    def started(self) -> bool:
+        return self.checkout is not None
+
+    def start(self, webhook_url: str):
+        if STRIPE_MODE == "mock":
+            self.checkout = MockStripeCheckout()
+            self.session_request_cls = MockCheckoutSessionRequest
+            return
+        from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionRequest
+        self._configure_http()
+        self._checkout_cls = StripeCheckout
+        self.checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+        self.session_request_cls = CheckoutSessionRequest
+
+    def checkout_for(self, webhook_url: str):
+        """Client whose checkout sessions report to webhook_url"""
+        if self._checkout_cls is None or webhook_url == STRIPE_WEBHOOK_URL:
+            # The mock keeps its sessions in memory, so it is shared whatever the URL
+            return self.checkout
+        checkout = self._by_webhook_url.get(webhook_url)
+        if checkout is None:
+            checkout = self._checkout_cls(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+            self._by_webhook_url[webhook_url] = checkout
+        self._by_webhook_url.move_to_end(webhook_url)
+        while len(self._by_webhook_url) > self.max_webhook_urls:
+            self._by_webhook_url.popitem(last=False)
+        return checkout
+
+    @staticmethod
+    def _configure_http():
+        # The Stripe SDK otherwise opens a fresh connection (and TLS handshake) per API call
+        try:
+            import stripe
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError:
+            return
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=STRIPE_POOL_SIZE))
+        stripe.default_http_client = stripe.RequestsClient(timeout=STRIPE_TIMEOUT_SECONDS, session=session)
+        stripe.max_network_retries = STRIPE_MAX_RETRIES
+
+payment_client = PaymentClient(STRIPE_MAX_WEBHOOK_URLS)
+
+def get_payment_client() -> PaymentClient:
+    # Started once in the startup hook
+    return payment_client
+
+def webhook_url_for(request: Request) -> str:
+    return STRIPE_WEBHOOK_URL or f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
+
 # ============== PAYMENT ENDPOINTS ==============
 @api_router.post("/payments/checkout", response_model=PaymentResponse)
-async def create_checkout(payment: PaymentCreate, request: Request, current_user: dict = Depends(get_current_user)):
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionRequest
-    
+async def create_checkout(request: Request, payment: PaymentCreate, current_user: dict = Depends(get_current_user), stripe: PaymentClient = Depends(get_payment_client)):
     origin_url = payment.origin_url
     
     if payment.order_id:
@@ -997,15 +1850,10 @@ async def create_checkout(payment: PaymentCreate, request: Request, current_user
         raise HTTPException(status_code=400, detail="Order or borrow ID required")
     
     # Create Stripe checkout
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    
     success_url = f"{origin_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{origin_url}/payment/cancel"
     
-    checkout_request = CheckoutSessionRequest(
+    checkout_request = stripe.session_request_cls(
         amount=float(amount),
         currency="usd",
         success_url=success_url,
@@ -1013,7 +1861,7 @@ async def create_checkout(payment: PaymentCreate, request: Request, current_user
         metadata=metadata
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_request)
+    session = await stripe.checkout_for(webhook_url_for(request)).create_checkout_session(checkout_request)
     
     # Record payment transaction
     payment_doc = {
@@ -1044,106 +1892,302 @@ async def create_checkout(payment: PaymentCreate, request: Request, current_user
     
     return PaymentResponse(checkout_url=session.url, session_id=session.session_id)
 
-@api_router.get("/payments/status/{session_id}", response_model=PaymentStatusResponse)
-async def get_payment_status(session_id: str, request: Request, current_user: dict = Depends(get_current_user)):
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
+async def apply_paid_payment(payment: dict):
+    """Mark the order or borrow a paid transaction belongs to as paid; safe to repeat"""
+    if payment.get("order_id"):
+        await db.orders.update_one(
+            {"id": payment["order_id"], "payment_status": {"$ne": PaymentStatus.PAID.value}},
+            {"$set": {
+                "payment_status": PaymentStatus.PAID.value,
+                "status": OrderStatus.PAID.value
+            }}
+        )
+    elif payment.get("borrow_id"):
+        borrow = await db.borrow_requests.find_one({"id": payment["borrow_id"]}, {"_id": 0})
+        if not borrow or borrow["status"] == BorrowStatus.ACTIVE.value:
+            return
+        # Mark item as rented before activating the borrow: the activation below is the
+        # step a retry can no longer repeat
+        await db.items.update_one(
+            {"id": borrow["item_id"]},
+            {"$set": {"status": ItemStatus.RENTED.value}}
+        )
+        await catalog_cache.bump(borrow["college_id"])
+        activated = await db.borrow_requests.find_one_and_update(
+            {"id": payment["borrow_id"], "status": {"$ne": BorrowStatus.ACTIVE.value}},
+            {"$set": {
+                "payment_status": PaymentStatus.PAID.value,
+                "status": BorrowStatus.ACTIVE.value
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if activated:
+            await bump_stats(activated["borrower_id"], items_borrowed=1)
+            await bump_stats(activated["lender_id"], items_lent=1)
+
+async def settle_payment(session_id: str, stripe_payment_status: str, stripe_status: Optional[str] = None,
+                         amount_total: Optional[int] = None, currency: Optional[str] = None) -> Optional[dict]:
+    """Cache Stripe's view of a checkout session and apply the paid/failed transition exactly once.
+
+    Returns the settled payment transaction, or None when nothing changed.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    observed = {"stripe_payment_status": stripe_payment_status, "checked_at": now}
+    if stripe_status:
+        observed["stripe_status"] = stripe_status
+    if amount_total is not None:
+        observed["amount_total"] = amount_total / 100  # Convert from cents
+    if currency:
+        observed["currency"] = currency
+    await db.payment_transactions.update_one({"session_id": session_id}, {"$set": observed})
+    
+    if stripe_payment_status == "paid":
+        new_status = PaymentStatus.PAID.value
+    elif stripe_status == "expired":
+        new_status = PaymentStatus.FAILED.value
+    else:
+        return None
     
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
+    if new_status == PaymentStatus.PAID.value:
+        # Apply the idempotent order/borrow writes while the transaction is still pending, so a
+        # failure part-way leaves it pending and the webhook retry or reconciler finishes the job
+        pending = await db.payment_transactions.find_one(
+            {"session_id": session_id, "payment_status": PaymentStatus.PENDING.value}, {"_id": 0}
+        )
+        if not pending:
+            return None
+        await apply_paid_payment(pending)
+    
+    # Only the caller that moves the transaction out of pending notifies the user
+    payment = await db.payment_transactions.find_one_and_update(
+        {"session_id": session_id, "payment_status": PaymentStatus.PENDING.value},
+        {"$set": {"payment_status": new_status, "settled_at": now}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not payment:
+        return None
     
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    status = await stripe_checkout.get_checkout_status(session_id)
+    if new_status == PaymentStatus.FAILED.value:
+        await event_hub.publish(payment["user_id"], "payment.failed", {"session_id": session_id})
+        return payment
     
-    # Update payment transaction
+    await event_hub.publish(payment["user_id"], "payment.paid", {
+        "session_id": session_id,
+        "order_id": payment.get("order_id"),
+        "borrow_id": payment.get("borrow_id")
+    })
+    return payment
+
+async def check_stripe_session(session_id: str, stripe: PaymentClient) -> Optional[dict]:
+    status = await stripe.checkout.get_checkout_status(session_id)
+    return await settle_payment(session_id, status.payment_status, status.status, status.amount_total, status.currency)
+
+async def reconcile_pending_payments():
+    """Check one batch of pending transactions that have not been looked at for an interval"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=PAYMENT_RECONCILE_INTERVAL_SECONDS)).isoformat()
+    pending = await db.payment_transactions.find(
+        {
+            "payment_status": PaymentStatus.PENDING.value,
+            "$or": [{"checked_at": {"$exists": False}}, {"checked_at": {"$lt": cutoff}}]
+        },
+        {"_id": 0, "session_id": 1}
+    ).sort("created_at", 1).limit(PAYMENT_RECONCILE_BATCH_SIZE).to_list(PAYMENT_RECONCILE_BATCH_SIZE)
+    
+    results = await asyncio.gather(*(check_stripe_session(p["session_id"], payment_client) for p in pending), return_exceptions=True)
+    for payment, result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to reconcile payment {payment['session_id']}: {result}")
+
+async def run_payment_reconciler():
+    while True:
+        try:
+            await reconcile_pending_payments()
+        except Exception as e:
+            logger.error(f"Payment reconciler error: {e}")
+        await asyncio.sleep(PAYMENT_RECONCILE_INTERVAL_SECONDS)
+
+def payment_status_response(payment: dict) -> PaymentStatusResponse:
+    paid = payment["payment_status"] == PaymentStatus.PAID.value
+    return PaymentStatusResponse(
+        status=payment.get("stripe_status", "complete" if paid else "open"),
+        payment_status=payment.get("stripe_payment_status", "paid" if paid else "unpaid"),
+        amount_total=payment.get("amount_total", payment["amount"]),
+        currency=payment.get("currency", "usd")
+    )
+
+@api_router.get("/payments/status/{session_id}", response_model=PaymentStatusResponse)
+async def get_payment_status(
+    session_id: str,
+    wait: int = Query(0, ge=0, le=PAYMENT_STATUS_MAX_WAIT_SECONDS),
+    current_user: dict = Depends(get_current_user),
+    stripe: PaymentClient = Depends(get_payment_client)
+):
+    """Answer from the locally settled state, optionally long-polling up to `wait` seconds for settlement"""
     payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    if payment["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    if payment and status.payment_status == "paid" and payment["payment_status"] != PaymentStatus.PAID.value:
-        # Update payment status
-        await db.payment_transactions.update_one(
-            {"session_id": session_id},
-            {"$set": {"payment_status": PaymentStatus.PAID.value}}
+    # The webhook may lag the success redirect; allow at most one live Stripe check per recheck window
+    checked_at = payment.get("checked_at")
+    recheck_before = (datetime.now(timezone.utc) - timedelta(seconds=PAYMENT_STATUS_RECHECK_SECONDS)).isoformat()
+    if payment["payment_status"] == PaymentStatus.PENDING.value and (not checked_at or checked_at < recheck_before):
+        try:
+            await check_stripe_session(session_id, stripe)
+        except Exception as e:
+            logger.error(f"Stripe status check failed for {session_id}: {e}")
+        payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+    
+    deadline = time.monotonic() + wait
+    while payment["payment_status"] == PaymentStatus.PENDING.value and time.monotonic() < deadline:
+        await asyncio.sleep(1)
+        payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+    
+    return payment_status_response(payment)
+
+# Checkout session status implied by each webhook event type; the verified payload only carries payment_status
+WEBHOOK_SESSION_STATUSES = {
+    "checkout.session.completed": "complete",
+    "checkout.session.async_payment_succeeded": "complete",
+    "checkout.session.async_payment_failed": "complete",
+    "checkout.session.expired": "expired",
+}
+
+class WebhookQueue:
+    """Durable queue of verified Stripe webhook events, applied by a background worker with event-id dedup"""
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, webhook_response) -> bool:
+        """Persist a verified event; returns False for a redelivery of an already queued event"""
+        session_id = webhook_response.session_id
+        event_type = getattr(webhook_response, "event_type", None)
+        event_id = getattr(webhook_response, "event_id", None) or f"{session_id}:{event_type}:{webhook_response.payment_status}"
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            await db.webhook_events.insert_one({
+                "event_id": event_id,
+                "event_type": event_type,
+                "session_id": session_id,
+                "payment_status": webhook_response.payment_status,
+                "stripe_status": WEBHOOK_SESSION_STATUSES.get(event_type),
+                "status": "queued",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "received_at": now
+            })
+        except DuplicateKeyError:
+            return False
+        self._wakeup.set()
+        return True
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        stale = (now - timedelta(seconds=WEBHOOK_LOCK_SECONDS)).isoformat()
+        return await db.webhook_events.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "next_attempt_at": {"$lte": now.isoformat()}},
+                # Reclaim events whose worker died mid-processing
+                {"status": "processing", "locked_at": {"$lt": stale}}
+            ]},
+            {"$set": {"status": "processing", "locked_at": now.isoformat()}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Update order or borrow
-        if payment.get("order_id"):
-            await db.orders.update_one(
-                {"id": payment["order_id"]},
-                {"$set": {
-                    "payment_status": PaymentStatus.PAID.value,
-                    "status": OrderStatus.PAID.value
-                }}
-            )
-        elif payment.get("borrow_id"):
-            await db.borrow_requests.update_one(
-                {"id": payment["borrow_id"]},
+
+    async def _process(self, event: dict):
+        try:
+            await settle_payment(event["session_id"], event["payment_status"], event.get("stripe_status"))
+        except Exception as e:
+            logger.error(f"Webhook event {event['event_id']} failed (attempt {event['attempts']}): {e}")
+            retry = event["attempts"] < WEBHOOK_MAX_ATTEMPTS
+            next_attempt = datetime.now(timezone.utc) + timedelta(seconds=2 ** event["attempts"])
+            await db.webhook_events.update_one(
+                {"event_id": event["event_id"]},
                 {"$set": {
-                    "payment_status": PaymentStatus.PAID.value,
-                    "status": BorrowStatus.ACTIVE.value
+                    "status": "queued" if retry else "failed",
+                    "next_attempt_at": next_attempt.isoformat(),
+                    "last_error": str(e)
                 }}
             )
-            # Mark item as rented
-            borrow = await db.borrow_requests.find_one({"id": payment["borrow_id"]}, {"_id": 0})
-            if borrow:
-                await db.items.update_one(
-                    {"id": borrow["item_id"]},
-                    {"$set": {"status": ItemStatus.RENTED.value}}
-                )
-    
-    return PaymentStatusResponse(
-        status=status.status,
-        payment_status=status.payment_status,
-        amount_total=status.amount_total / 100,  # Convert from cents
-        currency=status.currency
-    )
+            return
+        await db.webhook_events.update_one(
+            {"event_id": event["event_id"]},
+            {"$set": {"status": "done", "processed_at": datetime.now(timezone.utc).isoformat()}}
+        )
+
+    async def run(self):
+        while True:
+            try:
+                event = await self._claim()
+                if event:
+                    await self._process(event)
+                    continue
+            except Exception as e:
+                logger.error(f"Webhook worker error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=WEBHOOK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+webhook_queue = WebhookQueue()
 
 @api_router.post("/webhook/stripe")
-async def stripe_webhook(request: Request):
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
-    
+async def stripe_webhook(request: Request, stripe: PaymentClient = Depends(get_payment_client)):
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-    
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        if webhook_response.payment_status == "paid":
-            session_id = webhook_response.session_id
-            payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
-            
-            if payment and payment["payment_status"] != PaymentStatus.PAID.value:
-                await db.payment_transactions.update_one(
-                    {"session_id": session_id},
-                    {"$set": {"payment_status": PaymentStatus.PAID.value}}
-                )
-                
-                if payment.get("order_id"):
-                    await db.orders.update_one(
-                        {"id": payment["order_id"]},
-                        {"$set": {
-                            "payment_status": PaymentStatus.PAID.value,
-                            "status": OrderStatus.PAID.value
-                        }}
-                    )
-                elif payment.get("borrow_id"):
-                    await db.borrow_requests.update_one(
-                        {"id": payment["borrow_id"]},
-                        {"$set": {
-                            "payment_status": PaymentStatus.PAID.value,
-                            "status": BorrowStatus.ACTIVE.value
-                        }}
-                    )
-        
-        return {"status": "success"}
+        webhook_response = await stripe.checkout.handle_webhook(body, signature)
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         return {"status": "error", "message": str(e)}
+    
+    # Acknowledge as soon as the event is durable; settlement happens in the worker
+    queued = await webhook_queue.enqueue(webhook_response)
+    return {"status": "success", "queued": queued}
 
 # ============== REVIEW ENDPOINTS ==============
+async def apply_rating(user_id: str, rating: int):
+    """Fold one review into the user's running sum, count, histogram and average in a single atomic update"""
+    await db.users.update_one(
+        {"id": user_id},
+        [
+            {"$set": {
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating]},
+                "total_reviews": {"$add": [{"$ifNull": ["$total_reviews", 0]}, 1]},
+                f"rating_histogram.{rating}": {"$add": [{"$ifNull": [f"$rating_histogram.{rating}", 0]}, 1]}
+            }},
+            {"$set": {"rating": {"$round": [{"$divide": ["$rating_sum", "$total_reviews"]}, 1]}}}
+        ]
+    )
+    user_cache.invalidate(user_id)
+
+async def backfill_rating_aggregates():
+    """Build rating_sum/rating_histogram for users rated before aggregates were maintained"""
+    user_ids = await db.users.distinct("id", {"rating_sum": {"$exists": False}})
+    if not user_ids:
+        return
+    totals: Dict[str, dict] = {uid: {"rating_sum": 0, "total_reviews": 0, "rating_histogram": {}} for uid in user_ids}
+    pipeline = [
+        {"$match": {"reviewee_id": {"$in": user_ids}}},
+        {"$group": {"_id": {"user": "$reviewee_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]
+    async for row in db.reviews.aggregate(pipeline):
+        agg = totals[row["_id"]["user"]]
+        rating, count = row["_id"]["rating"], row["count"]
+        agg["rating_sum"] += rating * count
+        agg["total_reviews"] += count
+        agg["rating_histogram"][str(rating)] = count
+    for uid, agg in totals.items():
+        agg["rating"] = round(agg["rating_sum"] / agg["total_reviews"], 1) if agg["total_reviews"] else 0.0
+        await db.users.update_one({"id": uid}, {"$set": agg})
+
 @api_router.post("/reviews", response_model=ReviewResponse)
 async def create_review(review: ReviewCreate, current_user: dict = Depends(get_current_user)):
     reviewee_id = None
@@ -1197,12 +2241,8 @@ async def create_review(review: ReviewCreate, current_user: dict = Depends(get_c
     await db.reviews.insert_one(review_doc)
     
     # Update user rating
-    reviews = await db.reviews.find({"reviewee_id": reviewee_id}, {"_id": 0}).to_list(1000)
-    avg_rating = sum(r["rating"] for r in reviews) / len(reviews)
-    await db.users.update_one(
-        {"id": reviewee_id},
-        {"$set": {"rating": round(avg_rating, 1), "total_reviews": len(reviews)}}
-    )
+    await apply_rating(reviewee_id, review.rating)
+    await catalog_cache.bump(current_user["college_id"])
     
     return ReviewResponse(
         id=review_id,
@@ -1215,12 +2255,13 @@ async def create_review(review: ReviewCreate, current_user: dict = Depends(get_c
     )
 
 @api_router.get("/reviews/{user_id}", response_model=List[ReviewResponse])
-async def get_user_reviews(user_id: str):
+async def get_user_reviews(user_id: str, loader: EntityLoader = Depends(get_loader)):
     reviews = await db.reviews.find({"reviewee_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
     
+    reviewers = await loader.load_users(r["reviewer_id"] for r in reviews)
     result = []
     for review in reviews:
-        reviewer = await db.users.find_one({"id": review["reviewer_id"]}, {"_id": 0, "name": 1})
+        reviewer = reviewers.get(review["reviewer_id"])
         result.append(ReviewResponse(
             id=review["id"],
             reviewer_id=review["reviewer_id"],
@@ -1234,50 +2275,108 @@ async def get_user_reviews(user_id: str):
     return result
 
 # ============== STATS/DASHBOARD ENDPOINTS ==============
+STATS_FIELDS = ["items_listed", "items_bought", "items_sold", "items_borrowed", "items_lent", "sales_earnings", "rental_earnings"]
+
+async def bump_stats(user_id: str, **deltas):
+    """Apply a state transition to a user's materialized dashboard counters.
+
+    Counters are only incremented once they exist; a missing document is
+    rebuilt from source collections on the next dashboard read.
+    """
+    await db.user_stats.update_one({"user_id": user_id}, {"$inc": deltas})
+
+async def recompute_dashboard_stats(user_id: str) -> dict:
+    """Rebuild a user's counters in one aggregation round trip and store them"""
+    closed = BorrowStatus.CLOSED.value
+    pipeline = [
+        {"$match": {"owner_id": user_id}},
+        {"$project": {"_id": 0, "kind": {"$literal": "item"}}},
+        {"$unionWith": {"coll": "orders", "pipeline": [
+            {"$match": {
+                "status": OrderStatus.COMPLETED.value,
+                "$or": [{"buyer_id": user_id}, {"seller_id": user_id}]
+            }},
+            {"$project": {"_id": 0, "kind": {"$literal": "order"}, "buyer_id": 1, "seller_id": 1, "amount": 1}}
+        ]}},
+        {"$unionWith": {"coll": "borrow_requests", "pipeline": [
+            {"$match": {
+                "status": {"$in": [BorrowStatus.ACTIVE.value, closed]},
+                "$or": [{"borrower_id": user_id}, {"lender_id": user_id}]
+            }},
+            {"$project": {"_id": 0, "kind": {"$literal": "borrow"}, "borrower_id": 1, "lender_id": 1, "status": 1, "rental_amount": 1}}
+        ]}},
+        {"$facet": {
+            "listed": [{"$match": {"kind": "item"}}, {"$count": "n"}],
+            "bought": [{"$match": {"kind": "order", "buyer_id": user_id}}, {"$count": "n"}],
+            "sold": [
+                {"$match": {"kind": "order", "seller_id": user_id}},
+                {"$group": {"_id": None, "n": {"$sum": 1}, "amount": {"$sum": "$amount"}}}
+            ],
+            "borrowed": [{"$match": {"kind": "borrow", "borrower_id": user_id}}, {"$count": "n"}],
+            "lent": [
+                {"$match": {"kind": "borrow", "lender_id": user_id}},
+                {"$group": {"_id": None, "n": {"$sum": 1}, "rental": {
+                    "$sum": {"$cond": [{"$eq": ["$status", closed]}, "$rental_amount", 0]}
+                }}}
+            ]
+        }}
+    ]
+    facets = (await db.items.aggregate(pipeline).to_list(1))[0]
+    
+    def first(name: str) -> dict:
+        return facets[name][0] if facets[name] else {}
+    
+    stats = {
+        "items_listed": first("listed").get("n", 0),
+        "items_bought": first("bought").get("n", 0),
+        "items_sold": first("sold").get("n", 0),
+        "items_borrowed": first("borrowed").get("n", 0),
+        "items_lent": first("lent").get("n", 0),
+        "sales_earnings": first("sold").get("amount", 0.0),
+        "rental_earnings": first("lent").get("rental", 0.0)
+    }
+    await db.user_stats.update_one({"user_id": user_id}, {"$set": stats}, upsert=True)
+    return stats
+
 @api_router.get("/stats/dashboard")
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    # Get counts
-    items_listed = await db.items.count_documents({"owner_id": current_user["id"]})
-    items_bought = await db.orders.count_documents({"buyer_id": current_user["id"], "status": OrderStatus.COMPLETED.value})
-    items_sold = await db.orders.count_documents({"seller_id": current_user["id"], "status": OrderStatus.COMPLETED.value})
-    items_borrowed = await db.borrow_requests.count_documents({"borrower_id": current_user["id"], "status": {"$in": [BorrowStatus.ACTIVE.value, BorrowStatus.CLOSED.value]}})
-    items_lent = await db.borrow_requests.count_documents({"lender_id": current_user["id"], "status": {"$in": [BorrowStatus.ACTIVE.value, BorrowStatus.CLOSED.value]}})
-    
-    # Calculate earnings
-    sold_orders = await db.orders.find({"seller_id": current_user["id"], "status": OrderStatus.COMPLETED.value}, {"_id": 0, "amount": 1}).to_list(1000)
-    sales_earnings = sum(o["amount"] for o in sold_orders)
+async def get_dashboard_stats(refresh: bool = False, current_user: dict = Depends(get_current_user)):
+    stats = None if refresh else await db.user_stats.find_one({"user_id": current_user["id"]}, {"_id": 0})
+    if not stats:
+        stats = await recompute_dashboard_stats(current_user["id"])
     
-    lent_borrows = await db.borrow_requests.find({"lender_id": current_user["id"], "status": BorrowStatus.CLOSED.value}, {"_id": 0, "rental_amount": 1}).to_list(1000)
-    rental_earnings = sum(b["rental_amount"] for b in lent_borrows)
+    result = {field: stats.get(field, 0) for field in STATS_FIELDS}
+    result["total_earnings"] = result["sales_earnings"] + result["rental_earnings"]
+    return result
+
+@api_router.get("/stats/password-pool")
+async def get_password_pool_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != UserRole.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    return {
-        "items_listed": items_listed,
-        "items_bought": items_bought,
-        "items_sold": items_sold,
-        "items_borrowed": items_borrowed,
-        "items_lent": items_lent,
-        "sales_earnings": sales_earnings,
-        "rental_earnings": rental_earnings,
-        "total_earnings": sales_earnings + rental_earnings
-    }
+    return password_pool.stats()
 
 @api_router.get("/stats/featured-items", response_model=List[ItemResponse])
-async def get_featured_items(current_user: dict = Depends(get_current_user)):
+async def get_featured_items(request: Request, current_user: dict = Depends(get_current_user), loader: EntityLoader = Depends(get_loader)):
+    etag, cached = await catalog_cache.lookup(request, current_user["college_id"])
+    if cached:
+        return cached
+    
     items = await db.items.find(
         {"college_id": current_user["college_id"], "status": ItemStatus.AVAILABLE.value},
         {"_id": 0}
     ).sort("created_at", -1).limit(8).to_list(8)
     
-    result = []
+    owners = await loader.load_users(item["owner_id"] for item in items)
+    rows = []
     for item in items:
-        owner = await db.users.find_one({"id": item["owner_id"]}, {"_id": 0, "name": 1, "rating": 1})
-        result.append(ItemResponse(
+        owner = owners.get(item["owner_id"])
+        rows.append({
             **item,
-            owner_name=owner["name"] if owner else "Unknown",
-            owner_rating=owner.get("rating", 0.0) if owner else 0.0
-        ))
+            "owner_name": owner["name"] if owner else "Unknown",
+            "owner_rating": owner.get("rating", 0.0) if owner else 0.0
+        })
     
-    return result
+    return catalog_cache.store(etag, ItemResponse, rows)
 
 # ============== USER PROFILE (PUBLIC) ==============
 @api_router.get("/users/{user_id}", response_model=UserResponse)
@@ -1303,10 +2402,30 @@ async def get_user_profile(user_id: str, current_user: dict = Depends(get_curren
         status=user["status"],
         rating=user.get("rating", 0.0),
         total_reviews=user.get("total_reviews", 0),
+        rating_histogram=user.get("rating_histogram", {}),
         avatar_url=user.get("avatar_url"),
         created_at=user["created_at"]
     )
 
+class UserStatusUpdate(BaseModel):
+    status: UserStatus
+
+@api_router.put("/admin/users/{user_id}/status")
+async def update_user_status(user_id: str, update: UserStatusUpdate, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != UserRole.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    result = await db.users.update_one({"id": user_id}, {"$set": {"status": update.status.value}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if update.status == UserStatus.SUSPENDED:
+        user_cache.revoke(user_id)
+    else:
+        user_cache.restore(user_id)
+    
+    return {"message": "Status updated", "status": update.status.value}
+
 # ============== SEED DATA ==============
 @api_router.post("/seed")
 async def seed_data():
@@ -1327,79 +2446,518 @@ async def seed_data():
     return {"message": "Seed data created", "colleges": len(colleges)}
 
 # ============== IMAGE UPLOAD ==============
+def variant_filename(filename: str, variant: str) -> str:
+    return f"{filename.rsplit('.', 1)[0]}_{variant}.webp"
+
+def render_image_variants(uploads_dir: str, filename: str) -> Dict[str, str]:
+    """Resize an upload into WebP variants without EXIF/ICC metadata; runs in the image process pool.
+    Returns variant paths relative to the uploads directory, like the filename passed in."""
+    from PIL import Image, ImageOps
+    source = Path(uploads_dir) / filename
+    with Image.open(source) as original:
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        rendered = {}
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = img.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            name = variant_filename(filename, variant)
+            target = Path(uploads_dir) / name
+            tmp = target.with_name(f".{target.name}.part")
+            resized.save(tmp, "WEBP", quality=IMAGE_WEBP_QUALITY, method=4)
+            os.replace(tmp, target)
+            rendered[variant] = name
+    return rendered
+
+image_pool: Optional[ProcessPoolExecutor] = None
+
+async def process_image_variants(filename: str) -> Dict[str, str]:
+    """Generate derivatives off the event loop; returns variant URLs, or {} if the image can't be decoded"""
+    existing = {variant: variant_filename(filename, variant) for variant in IMAGE_VARIANTS}
+    if all((UPLOADS_DIR / name).exists() for name in existing.values()):
+        # Deduplicated upload: derivatives were rendered for the first copy
+        return {variant: f"{UPLOADS_URL_PREFIX}{name}" for variant, name in existing.items()}
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(image_pool, render_image_variants, str(UPLOADS_DIR), filename)
+    except Exception as e:
+        logger.warning(f"Could not build variants for {filename}: {e}")
+        return {}
+    return {variant: f"{UPLOADS_URL_PREFIX}{name}" for variant, name in rendered.items()}
+
+def image_variants_for(images: List[str]) -> List[Dict[str, str]]:
+    """Variant URLs for each item image that was uploaded here, keeping the image URL's host"""
+    result = []
+    for url in images:
+        variants = {}
+        if UPLOADS_URL_PREFIX in url:
+            base, filename = url.split(UPLOADS_URL_PREFIX, 1)
+            for variant in IMAGE_VARIANTS:
+                name = variant_filename(filename, variant)
+                if (UPLOADS_DIR / name).exists():
+                    variants[variant] = f"{base}{UPLOADS_URL_PREFIX}{name}"
+        result.append(variants)
+    return result
+
+class MultipartFileReader:
+    """Push-parses a multipart/form-data body as it arrives and hands out one file field's bytes"""
+    def __init__(self, request: Request, field_name: str):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type = ""
+        self._stream = request.stream()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = self._header_value = b""
+        self._in_file = self._found = self._done = False
+        self._pending: List[bytes] = []
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if not self._found and b"filename" in options and options.get(b"name") == self.field_name.encode():
+            self._in_file = self._found = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._done = True
+
+    async def _feed(self) -> bool:
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        return True
+
+    async def open(self):
+        """Read up to the end of the file field's headers, so filename and content_type are known"""
+        while not self._found:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail="No file provided")
+
+    async def chunks(self):
+        while True:
+            pending, self._pending = self._pending, []
+            for chunk in pending:
+                yield chunk
+            if self._done:
+                break
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+
+def safe_extension(filename: Optional[str], default: str = 'jpg') -> str:
+    ext = filename.rsplit('.', 1)[-1] if filename and '.' in filename else default
+    return re.sub(r'[^A-Za-z0-9]', '', ext)[:10].lower() or default
+
+async def store_upload(chunks, ext: str) -> str:
+    """Stream chunks to a temp file, aborting once the size limit is crossed, then store by content hash.
+
+    Identical bytes are stored once; the returned path is relative to UPLOADS_DIR.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOADS_DIR, prefix=".upload-", suffix=".part")
+    try:
+        size = 0
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=400, detail="File too large (max 5MB)")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        sha = digest.hexdigest()
+        now = datetime.now(timezone.utc).isoformat()
+        # last_uploaded_at keeps a re-uploaded blob out of the GC grace window until it gets referenced
+        blob = await db.blobs.find_one_and_update(
+            {"hash": sha},
+            {
+                "$set": {"last_uploaded_at": now},
+                "$setOnInsert": {
+                    "hash": sha,
+                    "filename": f"{sha[:2]}/{sha[2:4]}/{sha}.{ext}",
+                    "size": size,
+                    "refcount": 0,
+                    "created_at": now
+                }
+            },
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        target = UPLOADS_DIR / blob["filename"]
+        if target.exists():
+            os.unlink(tmp_path)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+        return blob["filename"]
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def blob_hashes(urls: List[str]) -> List[str]:
+    """Content hashes referenced by a list of upload URLs (legacy flat uploads are not tracked)"""
+    hashes = []
+    for url in urls:
+        match = BLOB_URL_PATTERN.search(url)
+        if match and match.group(1) not in hashes:
+            hashes.append(match.group(1))
+    return hashes
+
+async def update_blob_refs(old_urls: List[str], new_urls: List[str]):
+    old, new = set(blob_hashes(old_urls)), set(blob_hashes(new_urls))
+    if new - old:
+        await db.blobs.update_many({"hash": {"$in": list(new - old)}}, {"$inc": {"refcount": 1}})
+    if old - new:
+        await db.blobs.update_many({"hash": {"$in": list(old - new)}}, {"$inc": {"refcount": -1}})
+
+def remove_blob_files(filename: str):
+    for name in [filename] + [variant_filename(filename, v) for v in IMAGE_VARIANTS]:
+        try:
+            os.unlink(UPLOADS_DIR / name)
+        except FileNotFoundError:
+            pass
+
+async def collect_garbage_blobs() -> int:
+    """Delete unreferenced blobs past the grace period, re-checking items and avatars before removal"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=BLOB_GC_GRACE_SECONDS)).isoformat()
+    candidates = await db.blobs.find(
+        {"refcount": {"$lte": 0}, "last_uploaded_at": {"$lt": cutoff}},
+        {"_id": 0}
+    ).limit(BLOB_GC_BATCH_SIZE).to_list(BLOB_GC_BATCH_SIZE)
+    
+    removed = 0
+    for blob in candidates:
+        sha = blob["hash"]
+        item_refs = await db.items.count_documents({"blob_refs": sha})
+        avatar_refs = await db.users.count_documents({"avatar_blob": sha})
+        if item_refs or avatar_refs:
+            # The counter drifted; repair it rather than delete a live blob
+            await db.blobs.update_one({"hash": sha}, {"$set": {"refcount": item_refs + avatar_refs}})
+            continue
+        result = await db.blobs.delete_one({"hash": sha, "refcount": {"$lte": 0}, "last_uploaded_at": {"$lt": cutoff}})
+        if result.deleted_count:
+            await asyncio.to_thread(remove_blob_files, blob["filename"])
+            removed += 1
+    if removed:
+        logger.info(f"Blob GC removed {removed} unreferenced uploads")
+    return removed
+
+async def run_blob_gc():
+    while True:
+        try:
+            await collect_garbage_blobs()
+        except Exception as e:
+            logger.error(f"Blob GC error: {e}")
+        await asyncio.sleep(BLOB_GC_INTERVAL_SECONDS)
+
 @api_router.post("/upload")
-async def upload_image(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    """Upload an image and return its URL"""
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
-    # Check file size (max 5MB)
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
+async def upload_image(request: Request, current_user: dict = Depends(get_current_user)):
+    """Upload an image (multipart field "file") and return its URL"""
+    # Check file size (max 5MB) before reading the body; the form is then parsed as it streams in,
+    # so an undeclared oversized upload is cut off once it crosses the limit
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
         raise HTTPException(status_code=400, detail="File too large (max 5MB)")
     
-    # Generate unique filename
-    ext = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-    filename = f"{uuid.uuid4()}.{ext}"
-    filepath = UPLOADS_DIR / filename
+    upload = MultipartFileReader(request, "file")
+    await upload.open()
+    if not upload.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Save file
-    with open(filepath, 'wb') as f:
-        f.write(contents)
+    filename = await store_upload(upload.chunks(), safe_extension(upload.filename))
+    variants = await process_image_variants(filename)
     
     # Return URL
-    return {"url": f"/api/uploads/{filename}", "filename": filename}
-
-@api_router.post("/upload/base64")
-async def upload_base64_image(data: dict, current_user: dict = Depends(get_current_user)):
-    """Upload an image as base64 and return its URL"""
-    base64_data = data.get("image")
-    if not base64_data:
+    return {"url": f"/api/uploads/{filename}", "filename": filename, "variants": variants}
+
+class StreamingBase64Decoder:
+    """Decodes the base64 text of a JSON string piece by piece, carrying partial escapes and 4-character quanta between pieces"""
+    def __init__(self):
+        self._carry = b""
+        self._escape = b""
+
+    def _unescape(self, match) -> bytes:
+        seq = match.group(1)
+        if seq[:1] == b"u" and len(seq) == 5:
+            code = int(seq[1:], 16)
+            if code > 0x7f:
+                raise binascii.Error("Non-ASCII character in base64 data")
+            return bytes([code])
+        if match.end() == len(match.string) and (not seq or seq[:1] == b"u"):
+            self._escape = match.group(0)
+            return b""
+        if seq not in JSON_SIMPLE_ESCAPES:
+            raise binascii.Error("Invalid JSON escape in base64 data")
+        return JSON_SIMPLE_ESCAPES[seq]
+
+    def feed(self, view: memoryview) -> List[bytes]:
+        parts = []
+        if self._escape or NON_BASE64_PATTERN.search(view):
+            # Slow path for line-wrapped or escaped payloads: undo the escapes, then drop everything
+            # outside the alphabet (as b64decode does) before grouping into quanta
+            text, self._escape = self._escape + bytes(view), b""
+            view = memoryview(NON_BASE64_PATTERN.sub(b"", JSON_ESCAPE_PATTERN.sub(self._unescape, text)))
+        if self._carry:
+            need = 4 - len(self._carry)
+            quantum = self._carry + bytes(view[:need])
+            view = view[need:]
+            if len(quantum) < 4:
+                self._carry = quantum
+                return parts
+            parts.append(binascii.a2b_base64(quantum))
+        cut = len(view) - len(view) % 4
+        if cut:
+            # a2b_base64 reads the memoryview in place; only the decoded bytes are allocated
+            parts.append(binascii.a2b_base64(view[:cut]))
+        self._carry = bytes(view[cut:])
+        return parts
+
+    def finish(self) -> bytes:
+        if self._escape:
+            raise binascii.Error("Truncated JSON escape in base64 data")
+        return binascii.a2b_base64(self._carry) if self._carry else b""
+
+async def iter_base64_image(request: Request):
+    """Stream-decode the "image" string of a JSON body, skipping a data-URL prefix, as the body arrives"""
+    stream = request.stream()
+    head = bytearray()
+    pieces = []
+    async for chunk in stream:
+        head += chunk
+        match = BASE64_FIELD_PATTERN.search(head)
+        if match:
+            pieces.append((head, match.end()))
+            break
+        if len(head) > BASE64_FIELD_SCAN_BYTES:
+            break
+    if not pieces:
         raise HTTPException(status_code=400, detail="No image data provided")
     
-    # Remove data URL prefix if present
-    if ',' in base64_data:
-        base64_data = base64_data.split(',')[1]
+    async def remaining():
+        for piece in pieces:
+            yield piece
+        async for chunk in stream:
+            yield chunk, 0
     
+    decoder = StreamingBase64Decoder()
+    held = b""
+    prefix_checked = closed = False
+    decoded_any = False
     try:
-        contents = base64.b64decode(base64_data)
-    except Exception:
+        async for buf, start in remaining():
+            if closed:
+                continue  # Drain the rest of the body
+            end = buf.find(b'"', start)
+            closed = end != -1
+            view = memoryview(buf)[start:end if closed else len(buf)]
+            if not prefix_checked:
+                if held:
+                    view = memoryview(held + bytes(view))
+                # A data URL prefix ("data:image/png;base64,") sits at the very start of the value
+                comma = bytes(view[:DATA_URL_SCAN_BYTES]).find(b",")
+                if comma != -1:
+                    view = view[comma + 1:]
+                elif len(view) < DATA_URL_SCAN_BYTES and not closed:
+                    held = bytes(view)
+                    continue
+                prefix_checked = True
+            for part in decoder.feed(view):
+                decoded_any = decoded_any or bool(part)
+                yield part
+        if not closed:
+            raise HTTPException(status_code=400, detail="Invalid base64 data")
+        tail = decoder.finish()
+    except binascii.Error:
         raise HTTPException(status_code=400, detail="Invalid base64 data")
-    
-    # Check file size (max 5MB)
-    if len(contents) > 5 * 1024 * 1024:
+    if tail:
+        yield tail
+    elif not decoded_any:
+        raise HTTPException(status_code=400, detail="No image data provided")
+
+@api_router.post("/upload/base64")
+async def upload_base64_image(request: Request, current_user: dict = Depends(get_current_user)):
+    """Upload an image as base64 (JSON body {"image": ...}) and return its URL"""
+    # Check file size (max 5MB) up front: base64 inflates the payload by 4/3
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES * 4 // 3 + BASE64_FIELD_SCAN_BYTES:
         raise HTTPException(status_code=400, detail="File too large (max 5MB)")
     
-    # Generate unique filename
-    filename = f"{uuid.uuid4()}.jpg"
-    filepath = UPLOADS_DIR / filename
+    filename = await store_upload(iter_base64_image(request), "jpg")
+    variants = await process_image_variants(filename)
     
-    # Save file
-    with open(filepath, 'wb') as f:
-        f.write(contents)
-    
-    return {"url": f"/api/uploads/{filename}", "filename": filename}
+    return {"url": f"/api/uploads/{filename}", "filename": filename, "variants": variants}
 
 # ============== EMAIL NOTIFICATIONS ==============
-async def send_email_async(to_email: str, subject: str, html_content: str):
-    """Send email asynchronously using Resend"""
-    if not RESEND_API_KEY:
-        logger.info(f"[EMAIL MOCK] To: {to_email}, Subject: {subject}")
-        return {"id": "mock", "status": "mocked"}
-    
-    try:
-        params = {
-            "from": SENDER_EMAIL,
-            "to": [to_email],
+class ResendTransport:
+    """Sends batches through Resend's batch API on a dedicated, size-limited thread pool"""
+    def __init__(self, workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email")
+
+    async def send_batch(self, messages: List[dict]):
+        await asyncio.get_running_loop().run_in_executor(self.executor, resend.Batch.send, messages)
+
+    async def send(self, message: dict):
+        await asyncio.get_running_loop().run_in_executor(self.executor, resend.Emails.send, message)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+class MockEmailTransport:
+    """Local transport that records messages instead of sending them"""
+    def __init__(self):
+        self.sent: List[dict] = []
+
+    async def send_batch(self, messages: List[dict]):
+        for message in messages:
+            await self.send(message)
+
+    async def send(self, message: dict):
+        logger.info(f"[EMAIL MOCK] To: {message['to'][0]}, Subject: {message['subject']}")
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+class EmailOutbox:
+    """Durable email queue drained by a background dispatcher in batches with retries"""
+    def __init__(self, transport):
+        self.transport = transport
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, to_email: str, subject: str, html_content: str):
+        now = datetime.now(timezone.utc).isoformat()
+        await db.email_outbox.insert_one({
+            "id": str(uuid.uuid4()),
+            "to": to_email,
             "subject": subject,
-            "html": html_content
-        }
-        result = await asyncio.to_thread(resend.Emails.send, params)
-        logger.info(f"Email sent to {to_email}: {result}")
-        return result
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {e}")
-        return {"error": str(e)}
+            "html": html_content,
+            "status": "queued",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self._wakeup.set()
+
+    async def _claim_batch(self) -> List[dict]:
+        now = datetime.now(timezone.utc).isoformat()
+        candidates = await db.email_outbox.find(
+            {"status": "queued", "next_attempt_at": {"$lte": now}},
+            {"_id": 0, "id": 1}
+        ).sort("next_attempt_at", 1).limit(EMAIL_BATCH_SIZE).to_list(EMAIL_BATCH_SIZE)
+        if not candidates:
+            return []
+        claim_id = str(uuid.uuid4())
+        await db.email_outbox.update_many(
+            {"id": {"$in": [c["id"] for c in candidates]}, "status": "queued"},
+            {"$set": {"status": "sending", "claim_id": claim_id, "locked_at": now}, "$inc": {"attempts": 1}}
+        )
+        return await db.email_outbox.find({"claim_id": claim_id, "status": "sending"}, {"_id": 0}).to_list(EMAIL_BATCH_SIZE)
+
+    async def _send(self, batch: List[dict]):
+        messages = [{"from": SENDER_EMAIL, "to": [m["to"]], "subject": m["subject"], "html": m["html"]} for m in batch]
+        try:
+            await self.transport.send_batch(messages)
+        except Exception as e:
+            if len(batch) == 1:
+                await self._retry_later(batch[0], e)
+                return
+            # Resend rejects a whole batch for one invalid message; send one by one so the rest get through
+            logger.warning(f"Batch of {len(batch)} emails rejected, sending individually: {e}")
+            sent = []
+            for m, message in zip(batch, messages):
+                try:
+                    await self.transport.send(message)
+                except Exception as message_error:
+                    await self._retry_later(m, message_error)
+                else:
+                    sent.append(m)
+            batch = sent
+        if batch:
+            await db.email_outbox.update_many(
+                {"id": {"$in": [m["id"] for m in batch]}},
+                {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc).isoformat()}}
+            )
+
+    async def _retry_later(self, message: dict, error: Exception):
+        logger.error(f"Failed to send email {message['id']} (attempt {message['attempts']}): {error}")
+        next_attempt = datetime.now(timezone.utc) + timedelta(seconds=2 ** message["attempts"] * 5)
+        await db.email_outbox.update_one(
+            {"id": message["id"]},
+            {"$set": {
+                "status": "queued" if message["attempts"] < EMAIL_MAX_ATTEMPTS else "failed",
+                "next_attempt_at": next_attempt.isoformat(),
+                "last_error": str(error)
+            }}
+        )
+
+    async def _release_stale(self):
+        stale = (datetime.now(timezone.utc) - timedelta(seconds=EMAIL_LOCK_SECONDS)).isoformat()
+        await db.email_outbox.update_many(
+            {"status": "sending", "locked_at": {"$lt": stale}},
+            {"$set": {"status": "queued"}}
+        )
+
+    async def run(self):
+        while True:
+            try:
+                await self._release_stale()
+                batches = []
+                for _ in range(EMAIL_CONCURRENCY):
+                    batch = await self._claim_batch()
+                    if not batch:
+                        break
+                    batches.append(batch)
+                if batches:
+                    await asyncio.gather(*(self._send(b) for b in batches))
+                    continue
+            except Exception as e:
+                logger.error(f"Email dispatcher error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+email_outbox = EmailOutbox(ResendTransport(EMAIL_CONCURRENCY) if EMAIL_TRANSPORT == "resend" else MockEmailTransport())
 
 def get_welcome_email_html(name: str, college_name: str):
     return f"""
@@ -1571,6 +3129,7 @@ async def send_message(message: MessageCreate, current_user: dict = Depends(get_
             "item_id": message.item_id,
             "item_title": item["title"] if item else None,
             "college_id": current_user["college_id"],
+            "unread_counts": {current_user["id"]: 0, message.receiver_id: 0},
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         await db.conversations.insert_one(conversation)
@@ -1594,17 +3153,20 @@ async def send_message(message: MessageCreate, current_user: dict = Depends(get_
     # Update conversation with last message
     await db.conversations.update_one(
         {"id": conversation["id"]},
-        {"$set": {
-            "last_message": message.content[:100],
-            "last_message_at": now
-        }}
+        {
+            "$set": {
+                "last_message": message.content[:100],
+                "last_message_at": now
+            },
+            "$inc": {f"unread_counts.{message.receiver_id}": 1}
+        }
     )
     
     item = None
     if message.item_id:
         item = await db.items.find_one({"id": message.item_id}, {"_id": 0, "title": 1})
     
-    return MessageResponse(
+    response = MessageResponse(
         id=message_id,
         conversation_id=conversation["id"],
         sender_id=current_user["id"],
@@ -1618,6 +3180,8 @@ async def send_message(message: MessageCreate, current_user: dict = Depends(get_
         read=False,
         created_at=now
     )
+    await event_hub.publish(message.receiver_id, "message.new", response.model_dump())
+    return response
 
 @api_router.get("/conversations", response_model=List[ConversationResponse])
 async def get_conversations(current_user: dict = Depends(get_current_user)):
@@ -1629,13 +3193,7 @@ async def get_conversations(current_user: dict = Depends(get_current_user)):
     
     result = []
     for conv in conversations:
-        # Count unread messages
-        unread_count = await db.messages.count_documents({
-            "conversation_id": conv["id"],
-            "receiver_id": current_user["id"],
-            "read": False
-        })
-        
+        unread_count = conv.get("unread_counts", {}).get(current_user["id"], 0)
         result.append(ConversationResponse(
             id=conv["id"],
             participant_ids=conv["participant_ids"],
@@ -1651,7 +3209,7 @@ async def get_conversations(current_user: dict = Depends(get_current_user)):
     return result
 
 @api_router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
-async def get_conversation_messages(conversation_id: str, current_user: dict = Depends(get_current_user)):
+async def get_conversation_messages(conversation_id: str, current_user: dict = Depends(get_current_user), loader: EntityLoader = Depends(get_loader)):
     """Get all messages in a conversation"""
     conversation = await db.conversations.find_one({"id": conversation_id}, {"_id": 0})
     if not conversation:
@@ -1659,63 +3217,182 @@ async def get_conversation_messages(conversation_id: str, current_user: dict = D
     if current_user["id"] not in conversation["participant_ids"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Mark messages as read
-    await db.messages.update_many(
-        {"conversation_id": conversation_id, "receiver_id": current_user["id"]},
-        {"$set": {"read": True}}
-    )
+    # Mark messages as read; decrement by what was actually marked, so a message sent
+    # meanwhile keeps its count (the sender's $inc may land on either side of this)
+    if conversation.get("unread_counts", {}).get(current_user["id"], 0):
+        result = await db.messages.update_many(
+            {"conversation_id": conversation_id, "receiver_id": current_user["id"], "read": False},
+            {"$set": {"read": True}}
+        )
+        if result.modified_count:
+            await db.conversations.update_one(
+                {"id": conversation_id},
+                {"$inc": {f"unread_counts.{current_user['id']}": -result.modified_count}}
+            )
     
     messages = await db.messages.find(
         {"conversation_id": conversation_id},
         {"_id": 0}
     ).sort("created_at", 1).to_list(200)
     
-    result = []
+    users = await loader.load_users([m["sender_id"] for m in messages] + [m["receiver_id"] for m in messages])
+    items = await loader.load_items(m.get("item_id") for m in messages)
+    rows = []
     for msg in messages:
-        sender = await db.users.find_one({"id": msg["sender_id"]}, {"_id": 0, "name": 1, "avatar_url": 1})
-        receiver = await db.users.find_one({"id": msg["receiver_id"]}, {"_id": 0, "name": 1})
-        item = None
-        if msg.get("item_id"):
-            item = await db.items.find_one({"id": msg["item_id"]}, {"_id": 0, "title": 1})
+        sender = users.get(msg["sender_id"])
+        receiver = users.get(msg["receiver_id"])
+        item = items.get(msg["item_id"]) if msg.get("item_id") else None
         
-        result.append(MessageResponse(
-            id=msg["id"],
-            conversation_id=msg["conversation_id"],
-            sender_id=msg["sender_id"],
-            sender_name=sender["name"] if sender else "Unknown",
-            sender_avatar=sender.get("avatar_url") if sender else None,
-            receiver_id=msg["receiver_id"],
-            receiver_name=receiver["name"] if receiver else "Unknown",
-            item_id=msg.get("item_id"),
-            item_title=item["title"] if item else None,
-            content=msg["content"],
-            read=msg.get("read", False),
-            created_at=msg["created_at"]
-        ))
+        rows.append({
+            "id": msg["id"],
+            "conversation_id": msg["conversation_id"],
+            "sender_id": msg["sender_id"],
+            "sender_name": sender["name"] if sender else "Unknown",
+            "sender_avatar": sender.get("avatar_url") if sender else None,
+            "receiver_id": msg["receiver_id"],
+            "receiver_name": receiver["name"] if receiver else "Unknown",
+            "item_id": msg.get("item_id"),
+            "item_title": item["title"] if item else None,
+            "content": msg["content"],
+            "read": msg.get("read", False),
+            "created_at": msg["created_at"]
+        })
     
-    return result
+    return render_rows(MessageResponse, rows)
 
 @api_router.get("/messages/unread-count")
 async def get_unread_count(current_user: dict = Depends(get_current_user)):
     """Get total unread message count"""
-    count = await db.messages.count_documents({
-        "receiver_id": current_user["id"],
-        "read": False
-    })
-    return {"unread_count": count}
+    totals = await db.conversations.aggregate([
+        {"$match": {"participant_ids": current_user["id"]}},
+        {"$group": {"_id": None, "count": {"$sum": {"$ifNull": [f"$unread_counts.{current_user['id']}", 0]}}}}
+    ]).to_list(1)
+    return {"unread_count": totals[0]["count"] if totals else 0}
+
+async def backfill_unread_counts():
+    """Materialize unread_counts on conversations created before the counters existed"""
+    conversation_ids = await db.conversations.distinct("id", {"unread_counts": {"$exists": False}})
+    if not conversation_ids:
+        return
+    counts: Dict[str, Dict[str, int]] = {cid: {} for cid in conversation_ids}
+    pipeline = [
+        {"$match": {"conversation_id": {"$in": conversation_ids}, "read": False}},
+        {"$group": {"_id": {"conversation": "$conversation_id", "receiver": "$receiver_id"}, "count": {"$sum": 1}}}
+    ]
+    async for row in db.messages.aggregate(pipeline):
+        counts[row["_id"]["conversation"]][row["_id"]["receiver"]] = row["count"]
+    for cid, unread in counts.items():
+        await db.conversations.update_one({"id": cid}, {"$set": {"unread_counts": unread}})
 
 # Include router
 app.include_router(api_router)
 
 # Serve uploaded files
-from fastapi.responses import FileResponse
-
-@app.get("/api/uploads/{filename}")
-async def serve_upload(filename: str):
-    filepath = UPLOADS_DIR / filename
-    if not filepath.exists():
+from fastapi.responses import FileResponse, StreamingResponse
+import mimetypes
+
+# Upload names are content hashes or UUIDs and never change, so responses are cacheable forever
+UPLOAD_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Map each content coding named in Accept-Encoding to its q-value (0 means refused)"""
+    codings = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+def precompressed_sidecar(filepath: Path, accept_encoding: str) -> Optional[tuple]:
+    """Return (encoding, path) of the most preferred precompressed copy the client accepts, if any"""
+    codings = accepted_encodings(accept_encoding)
+    best = None
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        q = codings.get(encoding, codings.get("*", 0.0))
+        sidecar = filepath.with_name(filepath.name + suffix)
+        if q > 0 and (best is None or q > best[0]) and sidecar.is_file():
+            best = (q, encoding, sidecar)
+    return best[1:] if best else None
+
+def parse_range(header: str, size: int) -> Optional[tuple]:
+    """Return (start, end) inclusive for a single byte range, None to serve the whole file; raises for unsatisfiable ranges"""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+async def iter_file_range(path: Path, start: int, length: int):
+    with open(path, 'rb') as f:
+        await asyncio.to_thread(f.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(UPLOAD_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@app.get("/api/uploads/{filename:path}")
+async def serve_upload(filename: str, request: Request):
+    filepath = (UPLOADS_DIR / filename).resolve()
+    # Dotfiles include the in-progress .upload-*.part and .<variant>.part temp files
+    hidden = any(part.startswith(".") for part in Path(filename).parts)
+    if hidden or UPLOADS_DIR.resolve() not in filepath.parents or not filepath.is_file():
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(filepath)
+    
+    # Ranges apply to the identity file; otherwise serve a precompressed copy when the client accepts one.
+    # Each content coding is a different representation, so it gets its own ETag.
+    etag = f'"{filepath.stem}"'
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    ranged = range_header and (not if_range or if_range == etag)
+    sidecar = None if ranged else precompressed_sidecar(filepath, request.headers.get("accept-encoding", ""))
+    if sidecar:
+        etag = f'"{filepath.stem}-{sidecar[0]}"'
+    headers = {"ETag": etag, "Cache-Control": UPLOAD_CACHE_CONTROL, "Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(filepath.name)[0] or "application/octet-stream"
+    if ranged:
+        size = filepath.stat().st_size
+        byte_range = parse_range(range_header, size)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(iter_file_range(filepath, start, end - start + 1), status_code=206, media_type=media_type, headers=headers)
+    
+    if sidecar:
+        encoding, sidecar_path = sidecar
+        headers["Content-Encoding"] = encoding
+        return FileResponse(sidecar_path, media_type=media_type, headers=headers)
+    
+    return FileResponse(filepath, media_type=media_type, headers=headers)
 
 # CORS
 app.add_middleware(
@@ -1724,6 +3401,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Logging
@@ -1733,6 +3411,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+background_tasks: List[asyncio.Task] = []
+
+@app.on_event("startup")
+async def startup_tasks():
+    global image_pool
+    # Forking this process would copy the bcrypt/email thread pools and PyMongo's monitor threads
+    # (and their held locks) into the workers; forkserver children start from a clean process
+    image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    await ensure_indexes()
+    await backfill_effective_prices()
+    await backfill_rating_aggregates()
+    await backfill_unread_counts()
+    await event_hub.start()
+    payment_client.start(STRIPE_WEBHOOK_URL)
+    background_tasks.append(asyncio.create_task(run_payment_reconciler()))
+    background_tasks.append(asyncio.create_task(webhook_queue.run()))
+    background_tasks.append(asyncio.create_task(email_outbox.run()))
+    background_tasks.append(asyncio.create_task(run_blob_gc()))
+    if INDEX_ADVISOR:
+        await run_index_advisor()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await event_hub.stop()
+    for task in background_tasks:
+        task.cancel()
     client.close()
+    password_pool.executor.shutdown(wait=False)
+    email_outbox.transport.close()
+    if image_pool:
+        image_pool.shutdown(wait=False)
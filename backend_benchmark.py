@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the CPU-bound pieces of the request path in backend/server.py.
+
+Each benchmark runs an auto-calibrated number of loops per sample, repeated --repeat times,
+and is summarised per operation by its median, IQR and minimum. Results are compared with a
+stored baseline; a benchmark regresses when its median is slower than the baseline median by
+more than its threshold and even its fastest sample is slower than that median.
+
+    python backend_benchmark.py                    # run everything, compare with the baseline
+    python backend_benchmark.py --save-baseline    # record the current results as the baseline
+    python backend_benchmark.py --only items_page  # substring filter on benchmark names
+
+Password benchmarks follow BCRYPT_ROUNDS, which is recorded with the baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+import warnings
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'campus_store_benchmark')
+
+import server  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+# The default development JWT secret is shorter than newer PyJWT releases recommend
+warnings.filterwarnings("ignore", message="The HMAC key")
+
+DEFAULT_BASELINE = Path(__file__).parent / 'test_reports' / 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.10
+MIN_SAMPLE_SECONDS = 0.02
+
+@dataclass
+class Benchmark:
+    name: str
+    factory: Callable[[], Callable]
+    threshold: float
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+def benchmark(name: str, threshold: float = DEFAULT_THRESHOLD):
+    """Register a factory that prepares fixtures and returns the operation to time (sync or async)"""
+    def register(factory):
+        BENCHMARKS[name] = Benchmark(name, factory, threshold)
+        return factory
+    return register
+
+# ============== FIXTURES ==============
+NOW = datetime.now(timezone.utc)
+
+def sample_item_rows(count: int) -> List[dict]:
+    """Item documents shaped like get_items' enriched rows, including fields the response drops"""
+    rows = []
+    for i in range(count):
+        digest = uuid.uuid4().hex * 2
+        image = f"/api/uploads/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "college_id": "college-1",
+            "owner_id": str(uuid.uuid4()),
+            "owner_name": f"Student {i}",
+            "owner_rating": 4.5,
+            "title": f"Engineering Mathematics Vol. {i}",
+            "description": "Lightly used, a few pencil notes in the margins. Pick up near the library.",
+            "category": "textbooks",
+            "mode": "both",
+            "price_buy": 450.0,
+            "price_borrow": 25.0,
+            "deposit": 200.0,
+            "condition": "good",
+            "status": "available",
+            "images": [image],
+            "image_variants": [{
+                name: f"/api/uploads/{digest[:2]}/{digest[2:4]}/{digest}_{name}.webp"
+                for name in server.IMAGE_VARIANTS
+            }],
+            "effective_prices": [25.0, 450.0],
+            "blob_refs": [digest],
+            "created_at": (NOW - timedelta(minutes=i)).isoformat(),
+            "updated_at": (NOW - timedelta(minutes=i)).isoformat(),
+        })
+    return rows
+
+def sample_borrow_row() -> dict:
+    start = NOW + timedelta(days=1)
+    return {
+        "id": str(uuid.uuid4()),
+        "item_id": str(uuid.uuid4()),
+        "item_title": "Graphing Calculator",
+        "item_image": "/api/uploads/ab/cd/abcd.jpg",
+        "borrower_id": str(uuid.uuid4()),
+        "borrower_name": "Maya Chen",
+        "lender_id": str(uuid.uuid4()),
+        "lender_name": "Liam Patel",
+        "college_id": "college-1",
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=3)).isoformat(),
+        "days": 3,
+        "rental_amount": 75.0,
+        "deposit_amount": 200.0,
+        "total_amount": 275.0,
+        "status": "requested",
+        "payment_status": "pending",
+        "payment_session_id": None,
+        "created_at": NOW.isoformat(),
+        "returned_at": None,
+    }
+
+# ============== BENCHMARKS ==============
+@benchmark("hash_password")
+def bench_hash_password():
+    return lambda: server.hash_password("correct horse battery staple")
+
+@benchmark("verify_password")
+def bench_verify_password():
+    hashed = server.hash_password("correct horse battery staple")
+    return lambda: server.verify_password("correct horse battery staple", hashed)
+
+@benchmark("create_token")
+def bench_create_token():
+    return lambda: server.create_token("user-1", "college-1", "student")
+
+@benchmark("authenticate_token_cached")
+def bench_authenticate_token():
+    # JWT decode plus the user-cache hit that get_current_user takes on every authenticated request
+    user = {"id": "user-1", "college_id": "college-1", "name": "Maya Chen", "status": server.UserStatus.ACTIVE.value}
+    server.user_cache.ttl = 3600
+    server.user_cache.set(user["id"], user)
+    token = server.create_token(user["id"], user["college_id"], "student")
+
+    async def authenticate():
+        await server.authenticate_token(token)
+    return authenticate
+
+@benchmark("item_response", threshold=0.20)
+def bench_item_response():
+    row = sample_item_rows(1)[0]
+    return lambda: server.ItemResponse(**row)
+
+@benchmark("borrow_request_response", threshold=0.20)
+def bench_borrow_request_response():
+    row = sample_borrow_row()
+    return lambda: server.BorrowRequestResponse(**row)
+
+@benchmark("calculate_borrow_amounts", threshold=0.20)
+def bench_calculate_borrow_amounts():
+    row = sample_borrow_row()
+    return lambda: server.calculate_borrow_amounts(row["start_date"], row["end_date"], 25.0, 200.0)
+
+@benchmark("email_welcome_html", threshold=0.20)
+def bench_email_welcome():
+    return lambda: server.get_welcome_email_html("Maya Chen", "Stanford University")
+
+@benchmark("email_borrow_request_html", threshold=0.20)
+def bench_email_borrow_request():
+    return lambda: server.get_borrow_request_email_html("Liam Patel", "Maya Chen", "Graphing Calculator", 3, 275.0)
+
+@benchmark("email_borrow_approved_html", threshold=0.20)
+def bench_email_borrow_approved():
+    return lambda: server.get_borrow_approved_email_html("Maya Chen", "Graphing Calculator", "Liam Patel", 275.0)
+
+@benchmark("email_payment_success_html", threshold=0.20)
+def bench_email_payment_success():
+    return lambda: server.get_payment_success_email_html("Maya Chen", "Graphing Calculator", 275.0, "borrow")
+
+def items_page_field():
+    return create_response_field(name="Response_Get_Items", type_=List[server.ItemResponse], mode="serialization")
+
+async def standard_items_page(rows: List[dict], field) -> bytes:
+    """What FastAPI does without FAST_RESPONSES: build models, re-validate against response_model, encode with json"""
+    server.FAST_RESPONSES = False
+    models = server.render_rows(server.ItemResponse, rows)
+    content = await serialize_response(field=field, response_content=models, is_coroutine=True)
+    return JSONResponse(content).body
+
+async def fast_items_page(rows: List[dict]) -> bytes:
+    """Project trusted rows onto the model's fields and encode once with orjson"""
+    server.FAST_RESPONSES = True
+    return server.render_rows(server.ItemResponse, rows).body
+
+@benchmark("items_page_100_response_model")
+def bench_items_page_standard():
+    rows, field = sample_item_rows(100), items_page_field()
+
+    async def render():
+        await standard_items_page(rows, field)
+    return render
+
+@benchmark("items_page_100_fast_responses")
+def bench_items_page_fast():
+    rows, field = sample_item_rows(100), items_page_field()
+    # Both paths must produce the same JSON document before their timings mean anything
+    loop = asyncio.new_event_loop()
+    try:
+        standard = loop.run_until_complete(standard_items_page(rows, field))
+        fast = loop.run_until_complete(fast_items_page(rows))
+    finally:
+        loop.close()
+    if json.loads(standard) != json.loads(fast):
+        raise SystemExit("Fast response body differs from the response_model body")
+
+    async def render():
+        await fast_items_page(rows)
+    return render
+
+# ============== HARNESS ==============
+def loop_timer(operation: Callable, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    """Return run(n) -> seconds spent calling the operation n times"""
+    if asyncio.iscoroutinefunction(operation):
+        async def run_async(n: int) -> float:
+            started = time.perf_counter()
+            for _ in range(n):
+                await operation()
+            return time.perf_counter() - started
+        return lambda n: loop.run_until_complete(run_async(n))
+
+    def run(n: int) -> float:
+        started = time.perf_counter()
+        for _ in range(n):
+            operation()
+        return time.perf_counter() - started
+    return run
+
+def measure(bench: Benchmark, repeat: int, loop: asyncio.AbstractEventLoop) -> dict:
+    run = loop_timer(bench.factory(), loop)
+    # Calibrate so one sample is long enough for the clock, then discard a warm-up sample
+    loops = 1
+    while run(loops) < MIN_SAMPLE_SECONDS:
+        loops *= 2
+    run(loops)
+    samples = sorted(run(loops) / loops * 1e6 for _ in range(repeat))
+    q1, _, q3 = statistics.quantiles(samples, n=4)
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3),
+        "iqr_us": round(q3 - q1, 3),
+        "min_us": round(samples[0], 3),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+def machine_info() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "bcrypt_rounds": server.BCRYPT_ROUNDS,
+    }
+
+def compare(name: str, result: dict, baseline: Optional[dict], threshold: float) -> dict:
+    base = (baseline or {}).get("results", {}).get(name)
+    if not base:
+        return {"status": "new"}
+    change = result["median_us"] / base["median_us"] - 1
+    if change > threshold and result["min_us"] > base["median_us"]:
+        status = "REGRESSED"
+    elif change < -threshold and result["median_us"] < base["min_us"]:
+        status = "improved"
+    else:
+        status = "ok"
+    return {"status": status, "baseline_median_us": base["median_us"], "change_pct": round(change * 100, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for backend/server.py hot functions")
+    parser.add_argument("--repeat", type=int, default=15, help="samples per benchmark")
+    parser.add_argument("--only", help="run benchmarks whose name contains this substring")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, help="override every benchmark's regression threshold (e.g. 0.1 = 10%%)")
+    parser.add_argument("--output", type=Path, help="also write this run's results as JSON")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    if baseline and baseline.get("machine") != machine_info():
+        print(f"warning: baseline was recorded on {baseline.get('machine')}; comparisons are only indicative",
+              file=sys.stderr)
+
+    loop = asyncio.new_event_loop()
+    results, report = {}, {}
+    print(f"{'benchmark':<32} {'median us':>12} {'iqr us':>10} {'baseline':>12} {'change':>8}  status")
+    for bench in BENCHMARKS.values():
+        if args.only and args.only not in bench.name:
+            continue
+        result = measure(bench, args.repeat, loop)
+        threshold = args.threshold if args.threshold is not None else bench.threshold
+        verdict = compare(bench.name, result, baseline, threshold)
+        results[bench.name] = result
+        report[bench.name] = {**result, **verdict, "threshold": threshold}
+        baseline_text = f"{verdict['baseline_median_us']:.3f}" if "baseline_median_us" in verdict else "-"
+        change_text = f"{verdict['change_pct']:+.1f}%" if "change_pct" in verdict else "-"
+        print(f"{bench.name:<32} {result['median_us']:>12.3f} {result['iqr_us']:>10.3f} {baseline_text:>12} {change_text:>8}  {verdict['status']}")
+    loop.close()
+
+    run = {"created_at": datetime.now(timezone.utc).isoformat(), "machine": machine_info(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps({**run, "report": report}, indent=2))
+    if args.save_baseline:
+        # Keep entries for benchmarks that were filtered out of this run
+        merged = {**(baseline or {}).get("results", {}), **results}
+        args.baseline.write_text(json.dumps({**run, "results": merged}, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = [name for name, entry in report.items() if entry["status"] == "REGRESSED"]
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
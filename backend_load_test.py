@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Async load test for the Campus Store API, built on the backend_test.py flows.
+
+Each virtual user signs up and lists an item, then loops over a weighted mix of scenarios
+(browse, sell, buy -> checkout, borrow -> approve -> checkout) until the run ends. By default
+a local uvicorn server is started against a throwaway database with Stripe and Resend stubbed
+(STRIPE_MODE=mock, EMAIL_TRANSPORT=mock); pass --start-mongod to also run a temporary mongod.
+
+    python backend_load_test.py --users 50 --ramp linear --ramp-seconds 30 --duration 120 \\
+        --mix browse=60,sell=15,buy=15,borrow=10 --report load_report.json
+
+The JSON report has throughput and p50/p95/p99 latency per endpoint so runs can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).parent / 'backend'
+ORIGIN_URL = "http://localhost:3000"
+CATEGORIES = ["textbooks", "electronics", "furniture", "clothing", "sports", "instruments", "appliances", "other"]
+RAMP_PROFILES = ("constant", "linear", "step")
+DEFAULT_MIX = "browse=60,sell=15,buy=15,borrow=10"
+
+class ApiError(Exception):
+    pass
+
+class Metrics:
+    """Latency samples and error counts per endpoint, plus run/failure counts per scenario"""
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenarios: Dict[str, Dict[str, int]] = defaultdict(lambda: {"runs": 0, "failures": 0, "skipped": 0})
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(samples: List[float], pct: float) -> float:
+        """Nearest-rank percentile of sorted samples"""
+        return samples[max(math.ceil(pct / 100 * len(samples)) - 1, 0)]
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            endpoints[endpoint] = {
+                "count": len(samples),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(self.percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(self.percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(self.percentile(samples, 99) * 1000, 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        total = sum(len(s) for s in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+            "scenarios": dict(self.scenarios),
+        }
+
+class LoadClient:
+    """Thin wrapper over one shared AsyncClient that times every call under an endpoint name"""
+    def __init__(self, http: httpx.AsyncClient, metrics: Metrics):
+        self.http = http
+        self.metrics = metrics
+
+    async def call(self, endpoint: str, method: str, path: str, token: Optional[str] = None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, f"/api/{path}", headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.metrics.record(endpoint, time.perf_counter() - started, False)
+            raise ApiError(f"{endpoint}: {e!r}")
+        ok = response.status_code == 200
+        self.metrics.record(endpoint, time.perf_counter() - started, ok)
+        if not ok:
+            raise ApiError(f"{endpoint}: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+class Marketplace:
+    """State shared by virtual users: colleges and every user's token, so lenders can approve requests"""
+    def __init__(self, run_id: str, colleges: List[dict]):
+        self.run_id = run_id
+        self.colleges = colleges
+        self.tokens: Dict[str, str] = {}
+
+class VirtualUser:
+    def __init__(self, index: int, client: LoadClient, market: Marketplace, rng: random.Random, think_seconds: float):
+        self.index = index
+        self.client = client
+        self.market = market
+        self.rng = rng
+        self.think_seconds = think_seconds
+        self.token: Optional[str] = None
+        self.user_id: Optional[str] = None
+
+    async def signup(self):
+        college = self.market.colleges[self.index % len(self.market.colleges)]
+        data = await self.client.call("POST /auth/signup", "POST", "auth/signup", json={
+            "name": f"Load User {self.index}",
+            "email": f"load-{self.market.run_id}-{self.index}@{college['domain']}",
+            "password": "loadtest123",
+            "college_id": college["id"],
+        })
+        self.token = data["token"]
+        self.user_id = data["user"]["id"]
+        self.market.tokens[self.user_id] = self.token
+
+    async def pick_item(self, mode: str) -> Optional[dict]:
+        items = await self.client.call("GET /items", "GET", "items", self.token, params={"mode": mode, "limit": 20})
+        candidates = [i for i in items if i["owner_id"] != self.user_id and i["status"] == "available"]
+        return self.rng.choice(candidates) if candidates else None
+
+    async def settle(self, endpoint_kind: str, **target) -> str:
+        checkout = await self.client.call("POST /payments/checkout", "POST", "payments/checkout", self.token,
+                                          json={**target, "origin_url": ORIGIN_URL})
+        status = await self.client.call("GET /payments/status/{id}", "GET", f"payments/status/{checkout['session_id']}", self.token)
+        if status["payment_status"] != "paid":
+            raise ApiError(f"{endpoint_kind} checkout {checkout['session_id']} not settled: {status['payment_status']}")
+        return checkout["session_id"]
+
+    async def browse(self) -> bool:
+        items = await self.client.call("GET /items", "GET", "items", self.token, params={"limit": 20})
+        await self.client.call("GET /items", "GET", "items", self.token,
+                               params={"category": self.rng.choice(CATEGORIES), "limit": 20})
+        await self.client.call("GET /categories", "GET", "categories")
+        await self.client.call("GET /stats/featured-items", "GET", "stats/featured-items", self.token)
+        if items:
+            await self.client.call("GET /items/{id}", "GET", f"items/{self.rng.choice(items)['id']}", self.token)
+        return True
+
+    async def sell(self) -> bool:
+        price = round(self.rng.uniform(5, 500), 2)
+        await self.client.call("POST /items", "POST", "items", self.token, json={
+            "title": f"Load test item {uuid.uuid4().hex[:8]}",
+            "description": "Listed by the load generator",
+            "category": self.rng.choice(CATEGORIES),
+            "mode": "both",
+            "price_buy": price,
+            "price_borrow": round(price / 20, 2),
+            "deposit": round(price / 5, 2),
+            "condition": "good",
+            "images": [],
+        })
+        await self.client.call("GET /items/my", "GET", "items/my", self.token, params={"limit": 20})
+        return True
+
+    async def buy(self) -> bool:
+        item = await self.pick_item("buy")
+        if not item:
+            return False
+        order = await self.client.call("POST /orders", "POST", "orders", self.token, json={"item_id": item["id"]})
+        await self.settle("buy", order_id=order["id"])
+        await self.client.call("POST /orders/{id}/complete", "POST", f"orders/{order['id']}/complete", self.token)
+        return True
+
+    async def borrow(self) -> bool:
+        item = await self.pick_item("borrow")
+        lender_token = self.market.tokens.get(item["owner_id"]) if item else None
+        if not lender_token:
+            return False
+        start = datetime.now(timezone.utc) + timedelta(days=1)
+        request = await self.client.call("POST /borrow", "POST", "borrow", self.token, json={
+            "item_id": item["id"],
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=self.rng.randint(1, 7))).isoformat(),
+        })
+        await self.client.call("POST /borrow/{id}/approve", "POST", f"borrow/{request['id']}/approve", lender_token,
+                               json={"approved": True})
+        await self.settle("borrow", borrow_id=request["id"])
+        await self.client.call("POST /borrow/{id}/return", "POST", f"borrow/{request['id']}/return", self.token)
+        return True
+
+    async def run(self, start_delay: float, stop_at: float, mix: Dict[str, int]):
+        await asyncio.sleep(start_delay)
+        metrics = self.client.metrics
+        try:
+            await self.signup()
+            await self.sell()
+        except ApiError as e:
+            metrics.scenarios["onboard"]["failures"] += 1
+            print(f"VU {self.index} failed to onboard: {e}", file=sys.stderr)
+            return
+        metrics.scenarios["onboard"]["runs"] += 1
+
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < stop_at:
+            name = self.rng.choices(names, weights)[0]
+            stats = metrics.scenarios[name]
+            stats["runs"] += 1
+            try:
+                if not await getattr(self, name)():
+                    stats["skipped"] += 1
+            except ApiError as e:
+                stats["failures"] += 1
+                print(f"VU {self.index} {name} failed: {e}", file=sys.stderr)
+            await asyncio.sleep(self.think_seconds * self.rng.uniform(0.5, 1.5))
+
+def start_delay(profile: str, index: int, users: int, ramp_seconds: float, steps: int) -> float:
+    """Seconds after the start of the run at which a virtual user begins"""
+    if profile == "constant" or ramp_seconds <= 0:
+        return 0.0
+    if profile == "linear":
+        return ramp_seconds * index / users
+    batch = index * steps // users
+    return ramp_seconds * batch / steps
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("browse", "sell", "buy", "borrow"):
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LocalStack:
+    """Runs uvicorn (and optionally a temporary mongod) for one load test, then tears it down"""
+    def __init__(self, args, db_name: str):
+        self.args = args
+        self.db_name = db_name
+        self.mongo_url = args.mongo_url
+        self.base_url = None
+        self.server: Optional[subprocess.Popen] = None
+        self.mongod: Optional[subprocess.Popen] = None
+        self.mongo_dir: Optional[str] = None
+
+    def __enter__(self):
+        try:
+            if self.args.start_mongod:
+                self._start_mongod()
+            self._start_server()
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _start_mongod(self):
+        port = free_port()
+        self.mongo_dir = tempfile.mkdtemp(prefix="campus-load-mongo-")
+        self.mongod = subprocess.Popen(
+            [self.args.mongod_bin, "--dbpath", self.mongo_dir, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL
+        )
+        self.mongo_url = f"mongodb://127.0.0.1:{port}"
+        MongoClient(self.mongo_url, serverSelectionTimeoutMS=30000).admin.command("ping")
+
+    def _start_server(self):
+        port = free_port()
+        env = {
+            **os.environ,
+            "MONGO_URL": self.mongo_url,
+            "DB_NAME": self.db_name,
+            "STRIPE_MODE": "mock",
+            "EMAIL_TRANSPORT": "mock",
+            "RESEND_API_KEY": "",
+        }
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(self.args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+        self.base_url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.base_url}/api/colleges", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError("Server did not become ready within 60s")
+
+    @staticmethod
+    def _stop(process: Optional[subprocess.Popen]):
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def __exit__(self, *exc):
+        self._stop(self.server)
+        if self.mongo_dir:
+            # A temporary mongod takes its data directory with it
+            self._stop(self.mongod)
+            shutil.rmtree(self.mongo_dir, ignore_errors=True)
+        elif not self.args.keep_db:
+            MongoClient(self.mongo_url).drop_database(self.db_name)
+
+async def run_load(base_url: str, args, run_id: str) -> dict:
+    metrics = Metrics()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as http:
+        client = LoadClient(http, metrics)
+        await client.call("POST /seed", "POST", "seed")
+        colleges = await client.call("GET /colleges", "GET", "colleges")
+        market = Marketplace(run_id, colleges[:args.colleges])
+
+        users = [
+            VirtualUser(i, client, market, random.Random(args.seed + i), args.think_ms / 1000)
+            for i in range(args.users)
+        ]
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(*(
+            user.run(start_delay(args.ramp, user.index, args.users, args.ramp_seconds, args.ramp_steps), stop_at, args.mix)
+            for user in users
+        ))
+        return metrics.report(time.monotonic() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Async load test for the Campus Store API")
+    parser.add_argument("--users", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after the run starts")
+    parser.add_argument("--ramp", choices=RAMP_PROFILES, default="linear")
+    parser.add_argument("--ramp-seconds", type=float, default=10)
+    parser.add_argument("--ramp-steps", type=int, default=4, help="batches for the step profile")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"scenario weights, default {DEFAULT_MIX}")
+    parser.add_argument("--think-ms", type=float, default=200, help="mean pause between scenarios per user")
+    parser.add_argument("--colleges", type=int, default=1, help="spread users over this many seeded colleges")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--base-url", help="target an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--mongo-url", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--start-mongod", action="store_true", help="run a temporary mongod for the test")
+    parser.add_argument("--mongod-bin", default="mongod")
+    parser.add_argument("--keep-db", action="store_true", help="keep the load test database afterwards")
+    parser.add_argument("--report", default="load_report.json")
+    args = parser.parse_args()
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    config = {k: v for k, v in vars(args).items() if k not in ("report", "mongod_bin")}
+
+    if args.base_url:
+        report = asyncio.run(run_load(args.base_url, args, run_id))
+    else:
+        with LocalStack(args, f"campus_store_load_{run_id}") as stack:
+            report = asyncio.run(run_load(stack.base_url, args, run_id))
+
+    report = {"run_id": run_id, "config": config, **report}
+    Path(args.report).write_text(json.dumps(report, indent=2))
+
+    print(f"{'endpoint':<32} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<32} {stats['count']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+    print(f"\n{report['requests']} requests, {report['errors']} errors, {report['throughput_rps']} req/s -> {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic dataset for scale-testing the Campus Store backend.
+
+Fills Mongo with colleges, users, items, orders, borrow requests, payments, reviews and chat
+histories using batched insert_many. One scale unit is roughly 10k documents, so --scale 1, 10
+and 100 give ~10k, ~100k and ~1M. The same --seed always produces the same documents (except
+the shared bcrypt hash). Denormalized fields the API maintains are filled consistently:
+effective_prices, image_variants/blob_refs, rating_sum/rating_histogram, unread_counts and
+user_stats. Indexes are built after the load.
+
+    python backend_seed_data.py --mongo-url mongodb://localhost:27017 --db campus_store_scale --scale 10 --drop
+
+Every generated user can log in as user<N>@<college domain> with --password (default password123).
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+
+# Per scale unit
+USERS_PER_SCALE = 1000
+ITEMS_PER_USER = 3
+CONVERSATIONS_PER_SCALE = 500
+MEAN_MESSAGES_PER_CONVERSATION = 5
+
+# Lifecycle probabilities
+ORDER_PROBABILITY = 0.35
+BORROW_PROBABILITY = 0.4
+REVIEW_PROBABILITY = 0.6
+ITEM_WITH_CONVERSATION_PROBABILITY = 0.6
+
+# Skewed distributions: (category, weight, median buy price, price spread)
+CATEGORY_PROFILES = [
+    ("textbooks", 35, 45, 0.5),
+    ("electronics", 20, 250, 0.9),
+    ("furniture", 12, 90, 0.7),
+    ("clothing", 10, 25, 0.6),
+    ("sports", 8, 60, 0.7),
+    ("instruments", 5, 180, 0.8),
+    ("appliances", 5, 70, 0.6),
+    ("other", 5, 20, 0.9),
+]
+CATEGORY_WORDS = {
+    "textbooks": ["Calculus", "Organic Chemistry", "Linear Algebra", "Microeconomics", "Physics", "Data Structures",
+                  "Statistics", "Biology", "Thermodynamics", "Psychology"],
+    "electronics": ["Laptop", "Monitor", "Graphing Calculator", "Headphones", "Tablet", "Keyboard", "Camera", "Speaker"],
+    "furniture": ["Desk", "Office Chair", "Bookshelf", "Futon", "Lamp", "Dresser", "Bean Bag"],
+    "clothing": ["Winter Jacket", "Hoodie", "Formal Suit", "Rain Coat", "Sneakers", "Graduation Gown"],
+    "sports": ["Bicycle", "Tennis Racket", "Yoga Mat", "Dumbbells", "Skateboard", "Football"],
+    "instruments": ["Acoustic Guitar", "Keyboard Piano", "Violin", "Ukulele", "Drum Pad"],
+    "appliances": ["Mini Fridge", "Microwave", "Coffee Maker", "Kettle", "Fan", "Rice Cooker"],
+    "other": ["Board Game", "Projector Screen", "Bike Lock", "Backpack", "Poster Set"],
+}
+MODE_WEIGHTS = [("buy", 45), ("borrow", 20), ("both", 35)]
+CONDITION_WEIGHTS = [("new", 10), ("like_new", 25), ("good", 40), ("fair", 20), ("poor", 5)]
+ORDER_STATUS_WEIGHTS = [("completed", 55), ("paid", 10), ("created", 30), ("cancelled", 5)]
+BORROW_FINAL_STATUS_WEIGHTS = [("closed", 40), ("active", 15), ("returned", 5), ("approved", 10), ("requested", 20), ("rejected", 10)]
+RATING_WEIGHTS = [(5, 50), (4, 30), (3, 10), (2, 5), (1, 5)]
+FIRST_NAMES = ["Aarav", "Maya", "Liam", "Priya", "Noah", "Sofia", "Ethan", "Zara", "Lucas", "Ananya", "Mia", "Omar",
+               "Chloe", "Ravi", "Emma", "Diego", "Aisha", "Leo", "Hana", "Arjun"]
+LAST_NAMES = ["Sharma", "Smith", "Garcia", "Chen", "Patel", "Johnson", "Kim", "Nguyen", "Singh", "Brown", "Lopez", "Khan"]
+MESSAGE_LINES = ["Is this still available?", "Can you do a lower price?", "When can I pick it up?",
+                 "Does it come with a charger?", "I can meet at the library tomorrow.", "Sounds good, thanks!",
+                 "Is the deposit refundable?", "Could I borrow it for the weekend?", "Sent the payment.", "See you then!"]
+COMMENTS = ["Smooth handoff, item as described.", "Friendly and on time.", "Great condition, would trade again.",
+            "A bit late but fine.", "Item had more wear than listed.", None]
+
+def weighted(pairs):
+    values, weights = zip(*pairs)
+    return list(values), list(weights)
+
+def iso(moment: datetime) -> str:
+    return moment.isoformat()
+
+class BatchWriter:
+    """Buffers documents per collection and flushes them with unordered insert_many"""
+    def __init__(self, db, batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    async def add(self, collection: str, doc: dict):
+        buffer = self.buffers[collection]
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: str):
+        docs = self.buffers.pop(collection, [])
+        if docs:
+            await self.db[collection].insert_many(docs, ordered=False)
+            self.counts[collection] += len(docs)
+
+    async def flush_all(self):
+        for collection in list(self.buffers):
+            await self.flush(collection)
+
+class DatasetGenerator:
+    def __init__(self, server, writer: BatchWriter, rng: random.Random, args):
+        self.server = server
+        self.writer = writer
+        self.rng = rng
+        self.scale = args.scale
+        self.colleges_count = args.colleges or max(5, round(5 * math.sqrt(args.scale)))
+        self.end = datetime.fromisoformat(args.end_date)
+        self.start = self.end - timedelta(days=365)
+        self.password_hash = server.hash_password(args.password)
+        self.colleges: List[dict] = []
+        self.users: Dict[str, dict] = {}
+        self.college_users: Dict[str, List[str]] = defaultdict(list)
+        self.college_items: Dict[str, List[tuple]] = defaultdict(list)
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {field: 0 for field in server.STATS_FIELDS})
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def between(self, start: datetime, end: datetime) -> datetime:
+        return start + (end - start) * self.rng.random()
+
+    def pick_counterparty(self, college_id: str, exclude: str) -> str:
+        # Active buyers/borrowers are skewed: low user indexes in each college trade far more often
+        members = self.college_users[college_id]
+        while True:
+            user_id = members[min(int(self.rng.paretovariate(1.2)) - 1, len(members) - 1)] if self.rng.random() < 0.5 \
+                else self.rng.choice(members)
+            if user_id != exclude:
+                return user_id
+
+    async def generate(self):
+        self.generate_colleges(self.colleges_count)
+        self.generate_users(USERS_PER_SCALE * self.scale)
+        for college in self.colleges:
+            await self.writer.add("colleges", college)
+        for user_id in list(self.users):
+            await self.generate_items_for(user_id)
+        await self.generate_conversations(CONVERSATIONS_PER_SCALE * self.scale)
+        # Users and stats go last so their rating and dashboard aggregates are complete
+        for user in self.users.values():
+            if user["total_reviews"]:
+                user["rating"] = round(user["rating_sum"] / user["total_reviews"], 1)
+            await self.writer.add("users", user)
+            await self.writer.add("user_stats", {"user_id": user["id"], **self.stats[user["id"]]})
+        await self.writer.flush_all()
+
+    def generate_colleges(self, count: int):
+        for n in range(count):
+            self.colleges.append({
+                "id": f"gen-col-{n + 1}",
+                "name": f"Generated University {n + 1}",
+                "domain": f"college{n + 1}.edu",
+                "is_active": True,
+                "created_at": iso(self.start),
+            })
+
+    def generate_users(self, count: int):
+        # Zipf-like college sizes: a few large campuses and a long tail
+        college_weights = [1 / (rank + 1) for rank in range(len(self.colleges))]
+        for n in range(count):
+            college = self.rng.choices(self.colleges, college_weights)[0]
+            user_id = self.new_id()
+            self.users[user_id] = {
+                "id": user_id,
+                "email": f"user{n}@{college['domain']}",
+                "password": self.password_hash,
+                "name": f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                "phone": f"+1555{self.rng.randrange(10 ** 7):07d}",
+                "college_id": college["id"],
+                "role": "student",
+                "status": "active",
+                "rating": 0.0,
+                "rating_sum": 0,
+                "total_reviews": 0,
+                "rating_histogram": {},
+                "avatar_url": f"https://api.dicebear.com/7.x/avataaars/svg?seed={user_id}",
+                "student_id_image": None,
+                "created_at": iso(self.between(self.start, self.end - timedelta(days=30))),
+            }
+            self.college_users[college["id"]].append(user_id)
+
+    async def generate_items_for(self, owner_id: str):
+        owner = self.users[owner_id]
+        # Listing activity is heavy-tailed: most students list one or two things, a few list dozens
+        count = min(int(self.rng.paretovariate(1.5) * ITEMS_PER_USER / 3), 60)
+        categories, category_weights = weighted([(c[0], c[1]) for c in CATEGORY_PROFILES])
+        profiles = {c[0]: c for c in CATEGORY_PROFILES}
+        modes, mode_weights = weighted(MODE_WEIGHTS)
+        conditions, condition_weights = weighted(CONDITION_WEIGHTS)
+        tradeable = len(self.college_users[owner["college_id"]]) > 1
+        for _ in range(count):
+            category = self.rng.choices(categories, category_weights)[0]
+            _, _, median, spread = profiles[category]
+            mode = self.rng.choices(modes, mode_weights)[0]
+            base_price = round(self.rng.lognormvariate(math.log(median), spread), 2)
+            price_buy = base_price if mode != "borrow" else None
+            price_borrow = round(max(base_price / 20, 1), 2) if mode != "buy" else None
+            deposit = round(base_price / 4, 2) if mode != "buy" else None
+            created = self.between(datetime.fromisoformat(owner["created_at"]), self.end)
+            word = self.rng.choice(CATEGORY_WORDS[category])
+            condition = self.rng.choices(conditions, condition_weights)[0]
+            images = [f"https://picsum.photos/seed/{self.rng.getrandbits(32)}/640/480"]
+            item = {
+                "id": self.new_id(),
+                "college_id": owner["college_id"],
+                "owner_id": owner_id,
+                "title": f"{word} ({self.rng.choice(['used', 'barely used', 'great deal', 'like new', '2nd hand'])})",
+                "description": f"{word} in {condition.replace('_', ' ')} shape. "
+                               f"Pick up on campus, message me for details.",
+                "category": category,
+                "mode": mode,
+                "price_buy": price_buy,
+                "price_borrow": price_borrow,
+                "deposit": deposit,
+                "condition": condition,
+                "status": "available",
+                "images": images,
+                "image_variants": self.server.image_variants_for(images),
+                "blob_refs": self.server.blob_hashes(images),
+                "effective_prices": self.server.effective_prices(mode, price_buy, price_borrow),
+                "created_at": iso(created),
+                "updated_at": iso(created),
+            }
+            self.stats[owner_id]["items_listed"] += 1
+
+            if tradeable and mode != "borrow" and self.rng.random() < ORDER_PROBABILITY:
+                await self.generate_order(item, created)
+            elif tradeable and mode != "buy" and self.rng.random() < BORROW_PROBABILITY:
+                await self.generate_borrows(item, created)
+            self.college_items[item["college_id"]].append((item["id"], item["title"], owner_id))
+            await self.writer.add("items", item)
+
+    async def generate_payment(self, user_id: str, amount: float, created: datetime, order_id=None, borrow_id=None) -> str:
+        """A settled checkout for a paid order or rental; returns its session id"""
+        session_id = f"cs_gen_{self.rng.getrandbits(64):016x}"
+        if order_id:
+            metadata = {"type": "buy", "order_id": order_id, "user_id": user_id}
+        else:
+            metadata = {"type": "borrow", "borrow_id": borrow_id, "user_id": user_id}
+        settled = iso(created + timedelta(minutes=2))
+        await self.writer.add("payment_transactions", {
+            "id": self.new_id(),
+            "session_id": session_id,
+            "user_id": user_id,
+            "order_id": order_id,
+            "borrow_id": borrow_id,
+            "amount": amount,
+            "currency": "usd",
+            "payment_status": "paid",
+            "metadata": metadata,
+            "stripe_payment_status": "paid",
+            "checked_at": settled,
+            "settled_at": settled,
+            "created_at": iso(created),
+        })
+        return session_id
+
+    async def generate_order(self, item: dict, listed: datetime):
+        statuses, weights = weighted(ORDER_STATUS_WEIGHTS)
+        status = self.rng.choices(statuses, weights)[0]
+        buyer_id = self.pick_counterparty(item["college_id"], item["owner_id"])
+        created = self.between(listed, self.end)
+        order = {
+            "id": self.new_id(),
+            "item_id": item["id"],
+            "buyer_id": buyer_id,
+            "seller_id": item["owner_id"],
+            "college_id": item["college_id"],
+            "amount": float(item["price_buy"]),
+            "status": status,
+            "payment_status": "paid" if status in ("paid", "completed") else "pending",
+            "payment_session_id": None,
+            "created_at": iso(created),
+            "completed_at": None,
+        }
+        if status in ("paid", "completed"):
+            order["payment_session_id"] = await self.generate_payment(buyer_id, order["amount"], created, order_id=order["id"])
+        if status == "completed":
+            order["completed_at"] = iso(created + timedelta(days=self.rng.uniform(0.1, 3)))
+            item["status"] = "sold"
+            self.stats[buyer_id]["items_bought"] += 1
+            self.stats[item["owner_id"]]["items_sold"] += 1
+            self.stats[item["owner_id"]]["sales_earnings"] += order["amount"]
+            await self.generate_reviews(buyer_id, item["owner_id"], created, order_id=order["id"])
+        await self.writer.add("orders", order)
+
+    async def generate_borrows(self, item: dict, listed: datetime):
+        # Earlier rentals in an item's history have finished; only the latest can still be in flight
+        history = self.rng.randint(1, 3)
+        moment = listed
+        statuses, weights = weighted(BORROW_FINAL_STATUS_WEIGHTS)
+        for index in range(history):
+            status = self.rng.choices(statuses, weights)[0] if index == history - 1 else self.rng.choice(["closed", "rejected"])
+            borrower_id = self.pick_counterparty(item["college_id"], item["owner_id"])
+            created = self.between(moment, self.end)
+            moment = created
+            start = created + timedelta(days=self.rng.uniform(0.5, 3))
+            days, rental_amount, deposit_amount = self.server.calculate_borrow_amounts(
+                iso(start), iso(start + timedelta(days=self.rng.choice([1, 2, 3, 5, 7, 14]))),
+                item["price_borrow"], item["deposit"]
+            )
+            paid = status in ("active", "returned", "closed")
+            borrow = {
+                "id": self.new_id(),
+                "item_id": item["id"],
+                "borrower_id": borrower_id,
+                "lender_id": item["owner_id"],
+                "college_id": item["college_id"],
+                "start_date": iso(start),
+                "end_date": iso(start + timedelta(days=days)),
+                "days": days,
+                "rental_amount": rental_amount,
+                "deposit_amount": deposit_amount,
+                "total_amount": rental_amount + deposit_amount,
+                "status": status,
+                "payment_status": "refunded" if status == "closed" else "paid" if paid else "pending",
+                "payment_session_id": None,
+                "created_at": iso(created),
+                "returned_at": iso(start + timedelta(days=days)) if status in ("returned", "closed") else None,
+            }
+            if paid:
+                borrow["payment_session_id"] = await self.generate_payment(
+                    borrower_id, borrow["total_amount"], created, borrow_id=borrow["id"])
+            if status in ("active", "closed"):
+                self.stats[borrower_id]["items_borrowed"] += 1
+                self.stats[item["owner_id"]]["items_lent"] += 1
+            if status == "active":
+                item["status"] = "rented"
+            if status == "closed":
+                self.stats[item["owner_id"]]["rental_earnings"] += rental_amount
+                await self.generate_reviews(borrower_id, item["owner_id"], created, borrow_id=borrow["id"])
+            await self.writer.add("borrow_requests", borrow)
+
+    async def generate_reviews(self, party_a: str, party_b: str, after: datetime, order_id=None, borrow_id=None):
+        ratings, weights = weighted(RATING_WEIGHTS)
+        for reviewer_id, reviewee_id in ((party_a, party_b), (party_b, party_a)):
+            if self.rng.random() >= REVIEW_PROBABILITY:
+                continue
+            rating = self.rng.choices(ratings, weights)[0]
+            reviewee = self.users[reviewee_id]
+            reviewee["rating_sum"] += rating
+            reviewee["total_reviews"] += 1
+            reviewee["rating_histogram"][str(rating)] = reviewee["rating_histogram"].get(str(rating), 0) + 1
+            await self.writer.add("reviews", {
+                "id": self.new_id(),
+                "reviewer_id": reviewer_id,
+                "reviewee_id": reviewee_id,
+                "order_id": order_id,
+                "borrow_id": borrow_id,
+                "rating": rating,
+                "comment": self.rng.choice(COMMENTS),
+                "created_at": iso(self.between(after, self.end)),
+            })
+
+    async def generate_conversations(self, count: int):
+        college_ids = [c for c in self.college_users if len(self.college_users[c]) > 1]
+        college_weights = [len(self.college_users[c]) for c in college_ids]
+        for _ in range(count):
+            college_id = self.rng.choices(college_ids, college_weights)[0]
+            item = None
+            if self.college_items[college_id] and self.rng.random() < ITEM_WITH_CONVERSATION_PROBABILITY:
+                item = self.rng.choice(self.college_items[college_id])
+                first = item[2]
+            else:
+                first = self.rng.choice(self.college_users[college_id])
+            second = self.pick_counterparty(college_id, first)
+            participants = sorted([first, second])
+            conversation_id = self.new_id()
+            unread = {first: 0, second: 0}
+            moment = self.between(self.start + timedelta(days=30), self.end)
+
+            messages = max(1, min(int(self.rng.expovariate(1 / MEAN_MESSAGES_PER_CONVERSATION)) + 1, 200))
+            sender, receiver = second, first
+            last_content = None
+            for index in range(messages):
+                moment += timedelta(minutes=self.rng.expovariate(1 / 90))
+                # The tail of a conversation is unread by whoever has not replied yet
+                read = index < messages - self.rng.randint(0, 2)
+                if not read:
+                    unread[receiver] += 1
+                last_content = self.rng.choice(MESSAGE_LINES)
+                await self.writer.add("messages", {
+                    "id": self.new_id(),
+                    "conversation_id": conversation_id,
+                    "sender_id": sender,
+                    "receiver_id": receiver,
+                    "item_id": item[0] if item else None,
+                    "content": last_content,
+                    "read": read,
+                    "created_at": iso(moment),
+                })
+                if self.rng.random() < 0.7:
+                    sender, receiver = receiver, sender
+
+            await self.writer.add("conversations", {
+                "id": conversation_id,
+                "participant_ids": participants,
+                "participant_names": {uid: self.users[uid]["name"] for uid in participants},
+                "participant_avatars": {uid: self.users[uid]["avatar_url"] for uid in participants},
+                "item_id": item[0] if item else None,
+                "item_title": item[1] if item else None,
+                "college_id": college_id,
+                "unread_counts": unread,
+                "last_message": last_content[:100],
+                "last_message_at": iso(moment),
+                "created_at": iso(moment),
+            })
+
+GENERATED_COLLECTIONS = ["colleges", "users", "user_stats", "items", "orders", "borrow_requests",
+                         "payment_transactions", "reviews", "conversations", "messages"]
+
+async def run(args) -> dict:
+    import server
+
+    if args.drop:
+        for collection in GENERATED_COLLECTIONS:
+            await server.db[collection].drop()
+
+    started = time.monotonic()
+    writer = BatchWriter(server.db, args.batch_size)
+    await DatasetGenerator(server, writer, random.Random(args.seed), args).generate()
+    inserted = time.monotonic()
+    await server.ensure_indexes()
+    server.client.close()
+    return {
+        "documents": dict(writer.counts),
+        "total": sum(writer.counts.values()),
+        "insert_seconds": round(inserted - started, 2),
+        "index_seconds": round(time.monotonic() - inserted, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic Campus Store dataset")
+    parser.add_argument("--mongo-url", default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument("--db", default=os.environ.get('DB_NAME', 'campus_store_scale'))
+    parser.add_argument("--scale", type=int, default=1, help="~10k documents per unit (10 -> ~100k, 100 -> ~1M)")
+    parser.add_argument("--colleges", type=int, help="number of colleges (default grows with sqrt of the scale)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--end-date", default="2025-06-01T00:00:00+00:00", help="newest timestamp; data spans the year before")
+    parser.add_argument("--password", default="password123", help="password shared by every generated user")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections first")
+    args = parser.parse_args()
+
+    # server reads its connection settings at import time
+    os.environ['MONGO_URL'] = args.mongo_url
+    os.environ['DB_NAME'] = args.db
+
+    summary = asyncio.run(run(args))
+    for collection, count in sorted(summary["documents"].items()):
+        print(f"{collection:<22} {count:>10}")
+    print(f"{'total':<22} {summary['total']:>10}  "
+          f"(insert {summary['insert_seconds']}s, indexes {summary['index_seconds']}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { chatAPI } from '../lib/api';
+import { subscribeEvents } from '../lib/events';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from './ui/dialog';
@@ -18,8 +19,14 @@ export const ChatButton = ({ onClick }) => {
 
   useEffect(() => {
     fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, 30000); // Poll every 30s
-    return () => clearInterval(interval);
+    const unsubscribe = subscribeEvents((event) => {
+      if (event.type === 'message.new') fetchUnreadCount();
+    });
+    const interval = setInterval(fetchUnreadCount, 300000); // Safety net if the socket is down
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, []);
 
   const fetchUnreadCount = async () => {
@@ -70,6 +77,18 @@ export const ChatDialog = ({ open, onOpenChange, initialReceiverId, initialItemI
     }
   }, [selectedConversation]);
 
+  useEffect(() => {
+    if (!open) return;
+    return subscribeEvents((event) => {
+      if (event.type !== 'message.new') return;
+      if (selectedConversation?.id === event.data.conversation_id) {
+        fetchMessages(selectedConversation.id);
+      } else {
+        fetchConversations();
+      }
+    });
+  }, [open, selectedConversation]);
+
   useEffect(() => {
     scrollToBottom();
   }, [messages]);
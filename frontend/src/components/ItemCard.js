@@ -14,7 +14,7 @@ const CONDITION_LABELS = {
 export const ItemCard = ({ item }) => {
   const canBuy = item.mode === 'buy' || item.mode === 'both';
   const canBorrow = item.mode === 'borrow' || item.mode === 'both';
-  const image = item.images?.[0] || PLACEHOLDER_IMAGE;
+  const image = item.image_variants?.[0]?.card || item.images?.[0] || PLACEHOLDER_IMAGE;
 
   return (
     <Link 
@@ -78,7 +78,7 @@ export const borrowAPI = {
 // Payments
 export const paymentAPI = {
   createCheckout: (data) => api.post('/payments/checkout', data),
-  getStatus: (sessionId) => api.get(`/payments/status/${sessionId}`),
+  getStatus: (sessionId, params) => api.get(`/payments/status/${sessionId}`, { params }),
 };
 
 // Reviews
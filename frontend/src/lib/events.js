@@ -0,0 +1,51 @@
+const API_URL = process.env.REACT_APP_BACKEND_URL;
+const MAX_RETRY_DELAY = 30000;
+
+// One shared push socket for the whole app; components subscribe to its events
+const listeners = new Set();
+let socket = null;
+let retryDelay = 1000;
+let reconnectTimer = null;
+
+const connect = () => {
+  const token = localStorage.getItem('token');
+  if (!token) return;
+
+  const wsUrl = `${API_URL.replace(/^http/, 'ws')}/api/ws?token=${encodeURIComponent(token)}`;
+  socket = new WebSocket(wsUrl);
+
+  socket.onopen = () => {
+    retryDelay = 1000;
+  };
+
+  socket.onmessage = (message) => {
+    try {
+      const event = JSON.parse(message.data);
+      listeners.forEach((listener) => listener(event));
+    } catch (error) {
+      console.error('Invalid event payload:', error);
+    }
+  };
+
+  socket.onclose = () => {
+    socket = null;
+    if (listeners.size > 0) {
+      reconnectTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+    }
+  };
+};
+
+export const subscribeEvents = (listener) => {
+  listeners.add(listener);
+  if (!socket && !reconnectTimer) connect();
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) {
+      clearTimeout(reconnectTimer);
+      reconnectTimer = null;
+      socket?.close();
+    }
+  };
+};
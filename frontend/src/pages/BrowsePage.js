@@ -31,11 +31,15 @@ const CONDITIONS = [
   { value: 'poor', label: 'Poor' }
 ];
 
+const PAGE_SIZE = 20;
+
 export default function BrowsePage() {
   const [searchParams, setSearchParams] = useSearchParams();
   const [items, setItems] = useState([]);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
   const [showFilters, setShowFilters] = useState(false);
 
   // Filters
@@ -61,21 +65,28 @@ export default function BrowsePage() {
     }
   };
 
-  const fetchItems = async () => {
+  const fetchItems = async (cursor = null) => {
     try {
-      setLoading(true);
-      const params = {};
+      if (cursor) setLoadingMore(true);
+      else setLoading(true);
+      const params = { limit: PAGE_SIZE };
+      if (cursor) params.cursor = cursor;
       if (mode && mode !== 'all') params.mode = mode;
       if (category && category !== 'all') params.category = category;
       if (condition) params.condition = condition;
-      if (search) params.search = search;
+      if (search) {
+        params.search = search;
+        params.sort = 'relevance';
+      }
 
       const response = await itemAPI.getAll(params);
-      setItems(response.data);
+      setItems(cursor ? (prev) => [...prev, ...response.data] : response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       toast.error('Failed to load items');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -232,11 +243,26 @@ export default function BrowsePage() {
             <Loader2 className="w-8 h-8 animate-spin text-blue-600" />
           </div>
         ) : items.length > 0 ? (
-          <div className="product-grid">
-            {items.map((item) => (
-              <ItemCard key={item.id} item={item} />
-            ))}
-          </div>
+          <>
+            <div className="product-grid">
+              {items.map((item) => (
+                <ItemCard key={item.id} item={item} />
+              ))}
+            </div>
+            {nextCursor && (
+              <div className="flex justify-center mt-8">
+                <button
+                  onClick={() => fetchItems(nextCursor)}
+                  className="btn-primary flex items-center gap-2"
+                  disabled={loadingMore}
+                  data-testid="browse-load-more"
+                >
+                  {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                  Load more
+                </button>
+              </div>
+            )}
+          </>
         ) : (
           <div className="empty-state">
             <Package className="empty-state-icon" />
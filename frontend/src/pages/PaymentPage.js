@@ -183,7 +183,6 @@ export function PaymentSuccessPage() {
   
   const [loading, setLoading] = useState(true);
   const [status, setStatus] = useState(null);
-  const [attempts, setAttempts] = useState(0);
 
   useEffect(() => {
     if (sessionId) {
@@ -194,32 +193,28 @@ export function PaymentSuccessPage() {
   }, [sessionId]);
 
   const pollPaymentStatus = async () => {
-    if (attempts >= 5) {
-      setLoading(false);
-      return;
-    }
+    // Each request long-polls the server until the payment settles or the wait elapses
+    for (let attempt = 0; attempt < 3; attempt++) {
+      try {
+        const response = await paymentAPI.getStatus(sessionId, { wait: 20 });
+        setStatus(response.data);
 
-    try {
-      const response = await paymentAPI.getStatus(sessionId);
-      setStatus(response.data);
-      
-      if (response.data.payment_status === 'paid') {
+        if (response.data.payment_status === 'paid') {
+          setLoading(false);
+          toast.success('Payment successful!');
+          return;
+        } else if (response.data.status === 'expired') {
+          setLoading(false);
+          toast.error('Payment session expired');
+          return;
+        }
+      } catch (error) {
+        console.error('Error checking status:', error);
         setLoading(false);
-        toast.success('Payment successful!');
-      } else if (response.data.status === 'expired') {
-        setLoading(false);
-        toast.error('Payment session expired');
-      } else {
-        // Continue polling
-        setTimeout(() => {
-          setAttempts(prev => prev + 1);
-          pollPaymentStatus();
-        }, 2000);
+        return;
       }
-    } catch (error) {
-      console.error('Error checking status:', error);
-      setLoading(false);
     }
+    setLoading(false);
   };
 
   const isPaid = status?.payment_status === 'paid';
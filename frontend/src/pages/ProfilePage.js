@@ -230,6 +230,26 @@ export default function ProfilePage() {
             </div>
           </div>
 
+          {user.total_reviews > 0 && user.rating_histogram && (
+            <div className="space-y-1 mb-6" data-testid="rating-distribution">
+              {[5, 4, 3, 2, 1].map((star) => {
+                const count = user.rating_histogram[star] || 0;
+                return (
+                  <div key={star} className="flex items-center gap-2 text-sm text-slate-500">
+                    <span className="w-3">{star}</span>
+                    <div className="flex-1 h-2 bg-slate-100 rounded-full overflow-hidden">
+                      <div
+                        className="h-full bg-amber-400"
+                        style={{ width: `${(count / user.total_reviews) * 100}%` }}
+                      />
+                    </div>
+                    <span className="w-8 text-right">{count}</span>
+                  </div>
+                );
+              })}
+            </div>
+          )}
+
           {loading ? (
             <div className="flex justify-center py-8">
               <Loader2 className="w-6 h-6 animate-spin text-blue-600" />
@@ -0,0 +1,36 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'campus_store_test')
+
+import server  # noqa: E402
+from tests.fake_mongo import FakeDatabase  # noqa: E402
+
+
+def pytest_configure(config):
+    # The default development JWT secret is shorter than newer PyJWT releases recommend
+    config.addinivalue_line("filterwarnings", "ignore:The HMAC key")
+
+
+@pytest.fixture
+def login_as():
+    """Authenticate API requests as the given user dict, bypassing the token and database lookup"""
+    def override(user: dict):
+        server.app.dependency_overrides[server.get_current_user] = lambda: user
+    yield override
+    server.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Point the server at an empty in-memory database, with fresh process-local caches"""
+    db = FakeDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "catalog_cache", server.CatalogCache(server.CATALOG_VERSION_TTL_SECONDS, server.CATALOG_PAGE_CACHE_ENTRIES))
+    monkeypatch.setattr(server, "user_cache", server.UserCache(server.USER_CACHE_TTL_SECONDS, server.USER_CACHE_MAX_ENTRIES))
+    return db
@@ -0,0 +1,265 @@
+"""In-memory stand-in for the subset of Motor's collection API that server.py uses.
+
+Supports plain and operator queries ($eq, $ne, $lt, $lte, $gt, $gte, $in, $nin, $exists,
+$elemMatch, $or, $and) and $set / $unset / $inc / $setOnInsert updates. Anything else raises,
+so a test never passes against semantics the fake does not implement. Every call is recorded
+in `calls` as (method, args) for assertions on the queries a handler issues.
+"""
+
+import copy
+from types import SimpleNamespace
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+MISSING = object()
+
+
+def get_path(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+def set_path(doc, path, value):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+def unset_path(doc, path):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.get(part, {})
+    doc.pop(leaf, None)
+
+
+def compare(op, value, operand):
+    if value is MISSING or value is None:
+        return False
+    try:
+        return {"$lt": value < operand, "$lte": value <= operand, "$gt": value > operand, "$gte": value >= operand}[op]
+    except TypeError:
+        return False
+
+
+def match_operators(value, spec):
+    for op, operand in spec.items():
+        if op == "$eq":
+            ok = match_value(value, operand)
+        elif op == "$ne":
+            ok = not match_value(value, operand)
+        elif op in ("$lt", "$lte", "$gt", "$gte"):
+            ok = any(compare(op, v, operand) for v in value) if isinstance(value, list) else compare(op, value, operand)
+        elif op == "$in":
+            ok = any(match_value(value, candidate) for candidate in operand)
+        elif op == "$nin":
+            ok = not any(match_value(value, candidate) for candidate in operand)
+        elif op == "$exists":
+            ok = (value is not MISSING) == bool(operand)
+        elif op == "$elemMatch":
+            ok = isinstance(value, list) and any(match_operators(v, operand) for v in value)
+        else:
+            raise NotImplementedError(f"fake_mongo: query operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def match_value(value, expected):
+    if isinstance(expected, dict) and expected and all(k.startswith("$") for k in expected):
+        return match_operators(value, expected)
+    if value is MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def matches(doc, query):
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in expected):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in expected):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"fake_mongo: query operator {key}")
+        elif not match_value(get_path(doc, key), expected):
+            return False
+    return True
+
+
+def project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        result = {}
+        for key in included:
+            value = get_path(doc, key)
+            if value is not MISSING:
+                set_path(result, key, value)
+        return result
+    for key, v in projection.items():
+        if not v:
+            unset_path(doc, key)
+    return doc
+
+
+def apply_update(doc, update, inserting=False):
+    if isinstance(update, list):
+        raise NotImplementedError("fake_mongo: pipeline updates")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                set_path(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(doc, path, copy.deepcopy(value))
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                current = get_path(doc, path)
+                set_path(doc, path, (0 if current is MISSING else current) + value)
+            else:
+                raise NotImplementedError(f"fake_mongo: update operator {op}")
+
+
+def sort_docs(docs, spec):
+    if isinstance(spec, str):
+        spec = [(spec, 1)]
+    for field, direction in reversed(spec):
+        # Missing fields sort first, as BSON null does
+        docs.sort(key=lambda d: (get_path(d, field) is not MISSING, get_path(d, field) if get_path(d, field) is not MISSING else 0),
+                  reverse=direction == -1)
+    return docs
+
+
+class FakeCursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        sort_docs(self._docs, [(key, direction)] if direction is not None else key)
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        docs = self._docs[self._skip:]
+        docs = docs[:self._limit] if self._limit else docs
+        docs = docs[:length] if length else docs
+        return [project(d, self._projection) for d in docs]
+
+
+class FakeCollection:
+    def __init__(self, name, unique=()):
+        self.name = name
+        self.docs = []
+        self.unique = unique
+        self.calls = []
+
+    def _find(self, query):
+        return [d for d in self.docs if matches(d, query)]
+
+    async def insert_one(self, doc):
+        self.calls.append(("insert_one", (doc,)))
+        for field in self.unique:
+            if any(get_path(d, field) == get_path(doc, field) for d in self.docs):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc.get("id"))
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self.calls.append(("find_one", (query, projection)))
+        docs = self._find(query or {})
+        if sort:
+            sort_docs(docs, sort)
+        return project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None):
+        self.calls.append(("find", (query, projection)))
+        return FakeCursor(self._find(query or {}), projection)
+
+    async def count_documents(self, query):
+        self.calls.append(("count_documents", (query,)))
+        return len(self._find(query))
+
+    async def _update(self, method, query, update, upsert, many):
+        self.calls.append((method, (query, update)))
+        docs = self._find(query)
+        if not many:
+            docs = docs[:1]
+        modified = 0
+        for doc in docs:
+            before = copy.deepcopy(doc)
+            apply_update(doc, update)
+            modified += doc != before
+        if not docs and upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+        return SimpleNamespace(matched_count=len(docs), modified_count=modified)
+
+    async def update_one(self, query, update, upsert=False):
+        return await self._update("update_one", query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert=False):
+        return await self._update("update_many", query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        self.calls.append(("find_one_and_update", (query, update)))
+        docs = self._find(query)
+        if sort:
+            sort_docs(docs, sort)
+        if not docs:
+            if not upsert:
+                return None
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+            return project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        doc = docs[0]
+        before = project(doc, projection)
+        apply_update(doc, update)
+        return project(doc, projection) if return_document == ReturnDocument.AFTER else before
+
+    async def delete_one(self, query):
+        self.calls.append(("delete_one", (query,)))
+        docs = self._find(query)
+        if docs:
+            self.docs.remove(docs[0])
+        return SimpleNamespace(deleted_count=len(docs[:1]))
+
+
+class FakeDatabase:
+    """Collections are created on first access, like Motor's"""
+    UNIQUE = {"users": ("email",)}
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.UNIQUE.get(name, ()))
+        return self._collections[name]
+
+    __getitem__ = __getattr__
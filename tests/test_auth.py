@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+import server
+
+SIGNUP = {"email": "sam@state.edu", "password": "hunter22", "name": "Sam", "college_id": "college-1"}
+
+
+def test_signup_race_on_unique_email_returns_400(fake_db, monkeypatch):
+    fake_db.colleges.docs.append({"id": "college-1", "name": "State"})
+    fake_db.users.docs.append({"id": "user-1", "email": SIGNUP["email"]})
+
+    async def no_existing_user(query, projection=None):
+        # The concurrent signup commits between this check and our insert
+        return None
+    monkeypatch.setattr(fake_db.users, "find_one", no_existing_user)
+
+    response = TestClient(server.app).post("/api/auth/signup", json=SIGNUP)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert len(fake_db.users.docs) == 1
@@ -0,0 +1,72 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+DATA = bytes(range(256)) * 7 + b"campus"  # 1798 bytes: not a multiple of 3, so the tail is padded
+
+
+def make_request(body: bytes, chunk_size: int) -> Request:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+def decode(body: bytes, chunk_size: int = 65536) -> bytes:
+    async def collect():
+        return b"".join([part async for part in server.iter_base64_image(make_request(body, chunk_size))])
+    return asyncio.run(collect())
+
+
+def test_plain_base64():
+    body = json.dumps({"image": base64.b64encode(DATA).decode()}).encode()
+    assert decode(body) == DATA
+
+
+def test_data_url_prefix():
+    body = json.dumps({"image": "data:image/png;base64," + base64.b64encode(DATA).decode()}).encode()
+    assert decode(body) == DATA
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 2000, 2001, 2002])
+def test_line_wrapped_base64(size):
+    data = DATA[:size]
+    body = json.dumps({"image": base64.encodebytes(data).decode()}).encode()
+    assert decode(body) == data
+
+
+def test_escaped_characters():
+    encoded = base64.b64encode(DATA).decode()
+    escaped = '\\r\\n\\u%04x' % ord(encoded[40])
+    text = '"image": "data:image\\/png;base64,' + encoded[:40] + escaped + encoded[41:] + '"'
+    assert decode(("{" + text + "}").encode()) == DATA
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 257])
+def test_chunk_split_body(chunk_size):
+    body = json.dumps({"image": "data:image/jpeg;base64," + base64.encodebytes(DATA).decode()}).encode()
+    assert decode(body, chunk_size) == DATA
+
+
+@pytest.mark.parametrize("value", ["QUJD\\x", "QUJD\\u00e9", "QUJD\\u00zz", "QUJ"])
+def test_invalid_base64_rejected(value):
+    body = ('{"image": "' + value + '"}').encode()
+    with pytest.raises(HTTPException) as exc:
+        decode(body, 3)
+    assert exc.value.status_code == 400
+
+
+def test_missing_image_field():
+    with pytest.raises(HTTPException) as exc:
+        decode(b'{"picture": "QUJD"}')
+    assert exc.value.detail == "No image data provided"
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+USER = {"id": "owner", "college_id": "college-1", "name": "Ada", "rating": 4.5, "email": "ada@state.edu",
+        "role": "student", "status": "active", "created_at": "2026-01-01T00:00:00+00:00"}
+
+
+def item(i, **fields):
+    return {"id": f"item-{i:02d}", "college_id": "college-1", "owner_id": "owner", "title": f"Item {i}",
+            "description": "", "category": "textbooks", "mode": "buy", "price_buy": 10.0 + i, "condition": "good",
+            "status": "available", "images": [], "created_at": f"2026-01-{i + 1:02d}T00:00:00+00:00",
+            "updated_at": f"2026-01-{i + 1:02d}T00:00:00+00:00", **fields}
+
+
+@pytest.fixture
+def client(fake_db, login_as):
+    login_as(USER)
+    fake_db.users.docs.append(dict(USER))
+    fake_db.items.docs.extend(item(i) for i in range(5))
+    return TestClient(server.app)
+
+
+def stub_version(monkeypatch, version):
+    async def fixed(college_id):
+        return version[0]
+    monkeypatch.setattr(server.catalog_cache, "version", fixed)
+
+
+def test_etag_depends_on_version_and_query_but_not_param_order(client, monkeypatch):
+    version = [1]
+    stub_version(monkeypatch, version)
+    first = client.get("/api/items?mode=buy&limit=2").headers["etag"]
+    assert client.get("/api/items?limit=2&mode=buy").headers["etag"] == first
+    assert client.get("/api/items?limit=3&mode=buy").headers["etag"] != first
+    version[0] = 2
+    assert client.get("/api/items?mode=buy&limit=2").headers["etag"] != first
+
+
+def test_if_none_match_answers_304(client):
+    etag = client.get("/api/items").headers["etag"]
+    response = client.get("/api/items", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_cached_page_replays_body_and_next_cursor(client, fake_db):
+    first = client.get("/api/items?limit=2")
+    assert first.headers[server.NEXT_CURSOR_HEADER]
+    queries = len(fake_db.items.calls)
+
+    replay = client.get("/api/items?limit=2")
+
+    assert len(fake_db.items.calls) == queries
+    assert replay.json() == first.json()
+    assert replay.headers[server.NEXT_CURSOR_HEADER] == first.headers[server.NEXT_CURSOR_HEADER]
+    assert replay.headers["etag"] == first.headers["etag"]
+
+
+def test_page_cache_evicts_least_recently_used(fake_db):
+    cache = server.CatalogCache(version_ttl=60, max_pages=2)
+    for etag in ('"a"', '"b"', '"c"'):
+        cache.store(etag, server.ItemResponse, [])
+    assert list(cache._pages) == ['"b"', '"c"']
+
+
+def version_of(fake_db):
+    doc = asyncio.run(fake_db.catalog_versions.find_one({"college_id": "college-1"}))
+    return doc["version"] if doc else 0
+
+
+def bumps(fake_db, action):
+    before = version_of(fake_db)
+    action()
+    return version_of(fake_db) - before
+
+
+def test_item_changes_bump_the_version(client, fake_db):
+    new_item = {"title": "Lamp", "description": "Desk lamp", "category": "furniture", "mode": "buy",
+                "price_buy": 12.0, "condition": "good"}
+    assert bumps(fake_db, lambda: client.post("/api/items", json=new_item).raise_for_status()) == 1
+    assert bumps(fake_db, lambda: client.put("/api/items/item-01", json={"price_buy": 9.0}).raise_for_status()) == 1
+    assert bumps(fake_db, lambda: client.delete("/api/items/item-02").raise_for_status()) == 1
+
+
+def test_owner_rename_bumps_the_version(client, fake_db):
+    fake_db.colleges.docs.append({"id": "college-1", "name": "State"})
+    assert bumps(fake_db, lambda: client.put("/api/auth/profile", json={"name": "Ada L."}).raise_for_status()) == 1
+    assert bumps(fake_db, lambda: client.put("/api/auth/profile", json={"phone": "555"}).raise_for_status()) == 0
+
+
+def test_order_completion_and_return_bump_the_version(client, fake_db):
+    fake_db.orders.docs.append({"id": "order-1", "college_id": "college-1", "buyer_id": "owner", "seller_id": "seller",
+                                "item_id": "item-01", "amount": 11.0, "status": "paid", "payment_status": "paid"})
+    fake_db.borrow_requests.docs.append({"id": "borrow-1", "college_id": "college-1", "borrower_id": "owner",
+                                         "lender_id": "lender", "item_id": "item-03", "status": "active"})
+    assert bumps(fake_db, lambda: client.post("/api/orders/order-1/complete").raise_for_status()) == 1
+    assert bumps(fake_db, lambda: client.post("/api/borrow/borrow-1/return").raise_for_status()) == 1
+
+
+def test_bump_changes_the_served_etag(client, fake_db):
+    etag = client.get("/api/items").headers["etag"]
+    asyncio.run(server.catalog_cache.bump("college-1"))
+    response = client.get("/api/items", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+ADA = {"id": "ada", "college_id": "college-1", "name": "Ada", "rating": 4.5, "email": "ada@state.edu",
+       "role": "student", "status": "active", "created_at": "2026-01-01T00:00:00+00:00"}
+BEN = {**ADA, "id": "ben", "name": "Ben", "email": "ben@state.edu"}
+
+
+@pytest.fixture
+def client(fake_db):
+    for user in (ADA, BEN):
+        fake_db.users.docs.append(dict(user))
+        fake_db.user_stats.docs.append({"user_id": user["id"], **{field: 0 for field in server.STATS_FIELDS}})
+    fake_db.items.docs.append({"id": "item-1", "college_id": "college-1", "owner_id": "ben", "title": "Lamp",
+                               "status": "available", "images": []})
+    return TestClient(server.app)
+
+
+def stats(fake_db, user_id):
+    doc = next(d for d in fake_db.user_stats.docs if d["user_id"] == user_id)
+    return {field: value for field, value in doc.items() if value and field != "user_id"}
+
+
+def test_listing_and_deleting_an_item(client, fake_db, login_as):
+    login_as(ADA)
+    created = client.post("/api/items", json={"title": "Desk", "description": "Oak desk", "category": "furniture",
+                                              "mode": "buy", "price_buy": 30.0, "condition": "good"}).json()
+    assert stats(fake_db, "ada") == {"items_listed": 1}
+
+    client.delete(f"/api/items/{created['id']}").raise_for_status()
+    assert stats(fake_db, "ada") == {}
+
+
+def test_completing_an_order_counts_once(client, fake_db, login_as):
+    fake_db.orders.docs.append({"id": "order-1", "college_id": "college-1", "buyer_id": "ada", "seller_id": "ben",
+                                "item_id": "item-1", "amount": 25.0, "status": "paid", "payment_status": "paid"})
+    login_as(ADA)
+    client.post("/api/orders/order-1/complete").raise_for_status()
+    client.post("/api/orders/order-1/complete").raise_for_status()
+
+    assert stats(fake_db, "ada") == {"items_bought": 1}
+    assert stats(fake_db, "ben") == {"items_sold": 1, "sales_earnings": 25.0}
+
+
+def test_rental_lifecycle(client, fake_db, login_as):
+    fake_db.borrow_requests.docs.append({"id": "borrow-1", "college_id": "college-1", "borrower_id": "ada",
+                                         "lender_id": "ben", "item_id": "item-1", "status": "pending",
+                                         "rental_amount": 8.0, "deposit_amount": 20.0})
+    fake_db.payment_transactions.docs.append({"session_id": "cs_1", "user_id": "ada", "borrow_id": "borrow-1",
+                                              "payment_status": "pending"})
+    asyncio.run(server.settle_payment("cs_1", "paid", "complete"))
+    asyncio.run(server.apply_paid_payment(fake_db.payment_transactions.docs[0]))
+    assert stats(fake_db, "ada") == {"items_borrowed": 1}
+    assert stats(fake_db, "ben") == {"items_lent": 1}
+
+    # A returned rental drops out of the active counts until the lender confirms it
+    login_as(ADA)
+    client.post("/api/borrow/borrow-1/return").raise_for_status()
+    assert stats(fake_db, "ada") == {}
+    assert stats(fake_db, "ben") == {}
+
+    login_as(BEN)
+    client.post("/api/borrow/borrow-1/confirm-return").raise_for_status()
+    assert client.post("/api/borrow/borrow-1/confirm-return").status_code == 400
+    assert stats(fake_db, "ada") == {"items_borrowed": 1}
+    assert stats(fake_db, "ben") == {"items_lent": 1, "rental_earnings": 8.0}
+
+
+def test_missing_counters_are_left_for_recompute(fake_db):
+    asyncio.run(server.bump_stats("newcomer", items_listed=1))
+    assert fake_db.user_stats.docs == []
+
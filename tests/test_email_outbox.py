@@ -0,0 +1,73 @@
+import asyncio
+
+import server
+
+
+class StrictBatchTransport:
+    """Rejects a whole batch when any message is invalid, like Resend's default batch validation"""
+    def __init__(self):
+        self.sent = []
+        self.batches = 0
+
+    async def send_batch(self, messages):
+        self.batches += 1
+        if any(m["to"][0].startswith("invalid") for m in messages):
+            raise ValueError("Invalid `to` field")
+        self.sent.extend(messages)
+
+    async def send(self, message):
+        if message["to"][0].startswith("invalid"):
+            raise ValueError("Invalid `to` field")
+        self.sent.append(message)
+
+
+def drain_once(outbox):
+    async def run():
+        batch = await outbox._claim_batch()
+        await outbox._send(batch)
+    asyncio.run(run())
+
+
+def statuses(fake_db):
+    return {m["to"]: m["status"] for m in fake_db.email_outbox.docs}
+
+
+def enqueue(outbox, *recipients):
+    async def run():
+        for to in recipients:
+            await outbox.enqueue(to, "Hello", "<p>Hi</p>")
+    asyncio.run(run())
+
+
+def test_one_bad_message_does_not_fail_its_batch(fake_db):
+    transport = StrictBatchTransport()
+    outbox = server.EmailOutbox(transport)
+    enqueue(outbox, "a@state.edu", "invalid-address", "b@state.edu")
+
+    drain_once(outbox)
+
+    assert [m["to"][0] for m in transport.sent] == ["a@state.edu", "b@state.edu"]
+    assert statuses(fake_db) == {"a@state.edu": "sent", "invalid-address": "queued", "b@state.edu": "sent"}
+    bad = next(m for m in fake_db.email_outbox.docs if m["to"] == "invalid-address")
+    assert bad["last_error"] == "Invalid `to` field"
+
+
+def test_bad_message_fails_after_max_attempts(fake_db):
+    outbox = server.EmailOutbox(StrictBatchTransport())
+    enqueue(outbox, "invalid-address")
+    fake_db.email_outbox.docs[0]["attempts"] = server.EMAIL_MAX_ATTEMPTS - 1
+
+    drain_once(outbox)
+
+    assert statuses(fake_db) == {"invalid-address": "failed"}
+
+
+def test_valid_batch_is_sent_in_one_call(fake_db):
+    transport = StrictBatchTransport()
+    outbox = server.EmailOutbox(transport)
+    enqueue(outbox, "a@state.edu", "b@state.edu")
+
+    drain_once(outbox)
+
+    assert transport.batches == 1
+    assert statuses(fake_db) == {"a@state.edu": "sent", "b@state.edu": "sent"}
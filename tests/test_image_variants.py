@@ -0,0 +1,29 @@
+import server
+
+
+def test_variants_keep_sharded_path(tmp_path):
+    from PIL import Image
+    filename = "ab/cd/abcd1234.jpg"
+    (tmp_path / "ab" / "cd").mkdir(parents=True)
+    Image.new("RGB", (640, 320), "red").save(tmp_path / filename, "JPEG")
+
+    rendered = server.render_image_variants(str(tmp_path), filename)
+
+    assert rendered == {variant: f"ab/cd/abcd1234_{variant}.webp" for variant in server.IMAGE_VARIANTS}
+    for name in rendered.values():
+        assert (tmp_path / name).is_file()
+    with Image.open(tmp_path / rendered["thumb"]) as thumb:
+        assert thumb.size == (200, 100)
+
+
+def test_variants_render_in_a_forkserver_pool(tmp_path):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image
+    Image.new("RGB", (300, 300), "blue").save(tmp_path / "cover.jpg", "JPEG")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver")) as pool:
+        rendered = pool.submit(server.render_image_variants, str(tmp_path), "cover.jpg").result(timeout=60)
+
+    assert rendered["thumb"] == "cover_thumb.webp"
+    assert (tmp_path / "cover_thumb.webp").is_file()
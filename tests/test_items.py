@@ -0,0 +1,90 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+USER = {"id": "owner", "college_id": "college-1", "name": "Ada", "rating": 4.5, "email": "ada@state.edu",
+        "role": "student", "status": "active", "created_at": "2026-01-01T00:00:00+00:00"}
+
+
+def item(item_id, mode, price_buy=None, price_borrow=None):
+    return {"id": item_id, "college_id": "college-1", "owner_id": "owner", "title": item_id, "description": "",
+            "category": "textbooks", "mode": mode, "price_buy": price_buy, "price_borrow": price_borrow,
+            "condition": "good", "status": "available", "images": [],
+            "effective_prices": server.effective_prices(mode, price_buy, price_borrow),
+            "created_at": "2026-01-01T00:00:00+00:00", "updated_at": "2026-01-01T00:00:00+00:00"}
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("buy", [40.0]),
+    ("borrow", [5.0]),
+    ("both", [40.0, 5.0]),
+])
+def test_effective_prices_follow_the_mode(mode, expected):
+    assert server.effective_prices(mode, 40, 5) == expected
+
+
+def test_effective_prices_skip_missing_prices():
+    assert server.effective_prices("both", None, 5) == [5.0]
+    assert server.effective_prices("buy", None, None) == []
+
+
+@pytest.fixture
+def client(fake_db, login_as):
+    login_as(USER)
+    fake_db.users.docs.append(dict(USER))
+    fake_db.items.docs.extend([
+        item("cheap-buy", "buy", price_buy=8.0),
+        item("dear-buy", "buy", price_buy=60.0),
+        item("cheap-borrow", "borrow", price_borrow=4.0),
+        # Dear to buy, cheap to borrow: only a borrow-price filter may match it on cost
+        item("both", "both", price_buy=90.0, price_borrow=6.0),
+    ])
+    return TestClient(server.app)
+
+
+def listed(client, fake_db, **params):
+    response = client.get("/api/items", params=params)
+    response.raise_for_status()
+    query = next(args[0] for method, args in reversed(fake_db.items.calls) if method == "find")
+    return query, sorted(row["id"] for row in response.json())
+
+
+@pytest.mark.parametrize("mode, field, expected", [
+    ("buy", "price_buy", ["cheap-buy"]),
+    ("borrow", "price_borrow", ["both", "cheap-borrow"]),
+])
+def test_mode_filters_on_its_own_price(client, fake_db, mode, field, expected):
+    query, ids = listed(client, fake_db, mode=mode, max_price=10)
+    assert query[field] == {"$lte": 10}
+    assert "effective_prices" not in query
+    assert ids == expected
+
+
+def test_all_modes_filter_on_any_offered_price(client, fake_db):
+    query, ids = listed(client, fake_db, min_price=5, max_price=10)
+    assert query["effective_prices"] == {"$elemMatch": {"$gte": 5, "$lte": 10}}
+    assert ids == ["both", "cheap-buy"]
+
+
+def test_no_bounds_leave_prices_unfiltered(client, fake_db):
+    query, ids = listed(client, fake_db, mode="buy")
+    assert "price_buy" not in query and "effective_prices" not in query
+    assert ids == ["both", "cheap-buy", "dear-buy"]
+
+
+def test_create_and_update_maintain_effective_prices(client, fake_db):
+    created = client.post("/api/items", json={"title": "Bike", "description": "Road bike", "category": "sports",
+                                              "mode": "both", "price_buy": 120.0, "price_borrow": 15.0,
+                                              "condition": "good"}).json()
+
+    def stored():
+        return next(d for d in fake_db.items.docs if d["id"] == created["id"])["effective_prices"]
+
+    assert stored() == [120.0, 15.0]
+
+    client.put(f"/api/items/{created['id']}", json={"price_borrow": 12.0}).raise_for_status()
+    assert stored() == [120.0, 12.0]
+
+    client.put(f"/api/items/{created['id']}", json={"mode": "borrow"}).raise_for_status()
+    assert stored() == [12.0]
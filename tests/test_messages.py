@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+ADA = {"id": "ada", "college_id": "college-1", "name": "Ada", "rating": 4.5, "email": "ada@state.edu",
+       "role": "student", "status": "active", "created_at": "2026-01-01T00:00:00+00:00"}
+BEN = {**ADA, "id": "ben", "name": "Ben", "email": "ben@state.edu"}
+
+
+def message(i, sender="ben", receiver="ada", read=False):
+    return {"id": f"msg-{i}", "conversation_id": "conv-1", "sender_id": sender, "receiver_id": receiver,
+            "item_id": None, "content": f"Message {i}", "read": read, "created_at": f"2026-01-01T00:00:0{i}+00:00"}
+
+
+@pytest.fixture
+def client(fake_db, login_as):
+    login_as(ADA)
+    fake_db.users.docs.extend([dict(ADA), dict(BEN)])
+    fake_db.conversations.docs.append({"id": "conv-1", "participant_ids": ["ada", "ben"], "college_id": "college-1",
+                                       "unread_counts": {"ada": 2, "ben": 0}})
+    fake_db.messages.docs.extend([message(1, "ada", "ben", read=True), message(2), message(3)])
+    return TestClient(server.app)
+
+
+def unread(fake_db, user_id):
+    return fake_db.conversations.docs[0]["unread_counts"][user_id]
+
+
+def test_reading_clears_only_what_it_marked(client, fake_db):
+    rows = client.get("/api/conversations/conv-1/messages").json()
+    assert [row["read"] for row in rows] == [True, True, True]
+    assert unread(fake_db, "ada") == 0
+    assert unread(fake_db, "ben") == 0
+
+    # Nothing left to mark, so the counter is not touched again
+    writes = len(fake_db.conversations.calls)
+    client.get("/api/conversations/conv-1/messages").raise_for_status()
+    assert [c for c in fake_db.conversations.calls[writes:] if c[0] == "update_one"] == []
+
+
+def test_message_sent_while_reading_stays_unread(client, fake_db, monkeypatch):
+    mark_read = fake_db.messages.update_many
+
+    async def racing_send(query, update, upsert=False):
+        result = await mark_read(query, update, upsert)
+        # Ben's next message lands between the mark-read and the counter decrement
+        await fake_db.messages.insert_one(message(4))
+        await fake_db.conversations.update_one({"id": "conv-1"}, {"$inc": {"unread_counts.ada": 1}})
+        return result
+
+    monkeypatch.setattr(fake_db.messages, "update_many", racing_send)
+    client.get("/api/conversations/conv-1/messages").raise_for_status()
+
+    assert unread(fake_db, "ada") == 1
+    assert [m["id"] for m in fake_db.messages.docs if not m["read"]] == ["msg-4"]
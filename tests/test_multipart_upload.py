@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import server
+
+BOUNDARY = "campusstoreboundary"
+DATA = bytes(range(256)) * 40
+
+
+def multipart_body(parts) -> bytes:
+    body = b""
+    for name, filename, content_type, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n".encode()
+        if content_type:
+            body += f"Content-Type: {content_type}\r\n".encode()
+        body += b"\r\n" + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size: int, content_type: str = f"multipart/form-data; boundary={BOUNDARY}") -> Request:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]}, receive)
+
+
+def read_file(request: Request):
+    async def collect():
+        upload = server.MultipartFileReader(request, "file")
+        await upload.open()
+        data = b"".join([chunk async for chunk in upload.chunks()])
+        return upload.filename, upload.content_type, data
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 65536])
+def test_reads_file_field(chunk_size):
+    body = multipart_body([
+        ("title", None, None, b"Calculus textbook"),
+        ("file", "cover.png", "image/png", DATA),
+    ])
+    assert read_file(make_request(body, chunk_size)) == ("cover.png", "image/png", DATA)
+
+
+def test_missing_file_field():
+    body = multipart_body([("title", None, None, b"Calculus textbook")])
+    with pytest.raises(HTTPException) as exc:
+        read_file(make_request(body, 64))
+    assert exc.value.detail == "No file provided"
+
+
+def test_truncated_body():
+    body = multipart_body([("file", "cover.png", "image/png", DATA)])
+    with pytest.raises(HTTPException) as exc:
+        read_file(make_request(body[:len(body) // 2], 64))
+    assert exc.value.detail == "Incomplete multipart body"
+
+
+def test_rejects_non_multipart_body():
+    with pytest.raises(HTTPException) as exc:
+        read_file(make_request(b"{}", 64, "application/json"))
+    assert exc.value.status_code == 400
+
+
+def test_declared_oversized_upload_rejected_before_parsing(login_as):
+    login_as({"id": "user-1"})
+    body = multipart_body([("file", "cover.png", "image/png", b"\0" * (server.MAX_UPLOAD_BYTES + 1))])
+    response = TestClient(server.app).post(
+        "/api/upload", content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large (max 5MB)"
@@ -0,0 +1,77 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException, Response
+
+import server
+
+
+def make_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    doc = {"created_at": "2026-01-02T03:04:05+00:00", "id": "item-1"}
+    assert server.decode_cursor(server.encode_cursor(doc)) == {"$or": [
+        {"created_at": {"$lt": doc["created_at"]}},
+        {"created_at": doc["created_at"], "id": {"$lt": doc["id"]}}
+    ]}
+
+
+@pytest.mark.parametrize("value", [
+    [{"$ne": None}, "item-1"],
+    ["2026-01-02T03:04:05+00:00", {"$gt": ""}],
+    [1, 2],
+    ["only-one"],
+])
+def test_rejects_non_string_cursor_values(value):
+    with pytest.raises(HTTPException) as exc:
+        server.decode_cursor(make_cursor(value))
+    assert exc.value.status_code == 400
+
+
+def test_rejects_garbage_cursor():
+    with pytest.raises(HTTPException):
+        server.decode_cursor("not a cursor!")
+
+
+RANKING = [("created_at", -1), ("id", -1)]
+
+
+def ranked_pages(fake_db, limit):
+    pages, cursor = [], None
+    while True:
+        response = Response()
+        docs = asyncio.run(server.fetch_ranked_page(fake_db.items, {}, response, limit, RANKING, cursor))
+        pages.append([d["id"] for d in docs])
+        cursor = response.headers.get(server.NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_ranked_pages_follow_offset_cursors(fake_db):
+    fake_db.items.docs.extend({"id": f"item-{i:02d}", "created_at": f"2026-01-{i + 1:02d}"} for i in range(25))
+    pages = ranked_pages(fake_db, 10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"item-{i:02d}" for i in reversed(range(25))]
+
+
+def test_ranked_page_rejects_keyset_cursor(fake_db):
+    keyset = server.encode_cursor({"created_at": "2026-01-01", "id": "item-1"})
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.fetch_ranked_page(fake_db.items, {}, Response(), 10, RANKING, keyset))
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("value", [[-1], [True], ["10"], [1.5], [1, 2]])
+def test_rejects_invalid_offset_cursor(value):
+    with pytest.raises(HTTPException):
+        server.decode_offset_cursor(make_cursor(value))
+
+
+def test_keyset_page_rejects_offset_cursor(fake_db):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.fetch_page(fake_db.items, {}, Response(), 10, server.encode_offset_cursor(20)))
+    assert exc.value.status_code == 400
@@ -0,0 +1,11 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.mark.parametrize("role, status_code", [(server.UserRole.ADMIN.value, 200), (server.UserRole.STUDENT.value, 403)])
+def test_password_pool_stats_admin_only(login_as, role, status_code):
+    login_as({"id": "user-1", "role": role})
+    response = TestClient(server.app).get("/api/stats/password-pool")
+    assert response.status_code == status_code
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+class RecordingCheckout:
+    def __init__(self, api_key, webhook_url):
+        self.webhook_url = webhook_url
+
+
+def live_client(max_webhook_urls=2):
+    client = server.PaymentClient(max_webhook_urls)
+    client._checkout_cls = RecordingCheckout
+    client.checkout = RecordingCheckout(server.STRIPE_API_KEY, server.STRIPE_WEBHOOK_URL)
+    return client
+
+
+def test_checkout_clients_follow_the_request_webhook_url():
+    client = live_client()
+    assert client.checkout_for(server.STRIPE_WEBHOOK_URL) is client.checkout
+
+    first = client.checkout_for("https://a.example/api/webhook/stripe")
+    assert first.webhook_url == "https://a.example/api/webhook/stripe"
+    assert client.checkout_for("https://a.example/api/webhook/stripe") is first
+    assert client.checkout.webhook_url == server.STRIPE_WEBHOOK_URL
+
+
+def test_request_derived_clients_are_bounded():
+    client = live_client(max_webhook_urls=2)
+    first = client.checkout_for("https://a.example/api/webhook/stripe")
+    client.checkout_for("https://b.example/api/webhook/stripe")
+    client.checkout_for("https://c.example/api/webhook/stripe")
+    assert client.checkout_for("https://a.example/api/webhook/stripe") is not first
+
+
+def test_mock_mode_shares_one_session_store(monkeypatch):
+    monkeypatch.setattr(server, "STRIPE_MODE", "mock")
+    client = server.PaymentClient(2)
+    client.start("")
+    assert client.started
+    assert client.checkout_for("https://a.example/api/webhook/stripe") is client.checkout
+
+
+def fail_once(monkeypatch, collection, method):
+    original = getattr(collection, method)
+    calls = []
+
+    async def flaky(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ConnectionError("connection reset")
+        return await original(*args, **kwargs)
+    monkeypatch.setattr(collection, method, flaky)
+
+
+def test_order_settles_on_retry_after_a_failed_write(fake_db, monkeypatch):
+    fake_db.payment_transactions.docs.append({"session_id": "cs_1", "user_id": "buyer", "order_id": "order-1", "payment_status": "pending"})
+    fake_db.orders.docs.append({"id": "order-1", "status": "created", "payment_status": "pending"})
+    fail_once(monkeypatch, fake_db.orders, "update_one")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(server.settle_payment("cs_1", "paid", "complete"))
+    assert fake_db.payment_transactions.docs[0]["payment_status"] == "pending"
+
+    settled = asyncio.run(server.settle_payment("cs_1", "paid", "complete"))
+    assert settled["payment_status"] == "paid"
+    assert fake_db.orders.docs[0]["status"] == server.OrderStatus.PAID.value
+    assert fake_db.orders.docs[0]["payment_status"] == "paid"
+    assert asyncio.run(server.settle_payment("cs_1", "paid", "complete")) is None
+
+
+def test_borrow_settles_on_retry_after_a_failed_write(fake_db, monkeypatch):
+    fake_db.payment_transactions.docs.append({"session_id": "cs_2", "user_id": "borrower", "borrow_id": "borrow-1", "payment_status": "pending"})
+    fake_db.borrow_requests.docs.append({"id": "borrow-1", "item_id": "item-1", "college_id": "college-1",
+                                         "borrower_id": "borrower", "lender_id": "lender", "status": "approved"})
+    fake_db.items.docs.append({"id": "item-1", "status": "available"})
+    fake_db.user_stats.docs.extend([{"user_id": "borrower", "items_borrowed": 0}, {"user_id": "lender", "items_lent": 0}])
+    fail_once(monkeypatch, fake_db.items, "update_one")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(server.settle_payment("cs_2", "paid", "complete"))
+    assert fake_db.payment_transactions.docs[0]["payment_status"] == "pending"
+    assert fake_db.borrow_requests.docs[0]["status"] == "approved"
+
+    assert asyncio.run(server.settle_payment("cs_2", "paid", "complete"))["payment_status"] == "paid"
+    assert asyncio.run(server.settle_payment("cs_2", "paid", "complete")) is None
+    assert fake_db.borrow_requests.docs[0]["status"] == server.BorrowStatus.ACTIVE.value
+    assert fake_db.items.docs[0]["status"] == server.ItemStatus.RENTED.value
+    assert [s.get("items_borrowed", s.get("items_lent")) for s in fake_db.user_stats.docs] == [1, 1]
+
+
+def test_expired_session_fails_the_transaction(fake_db):
+    fake_db.payment_transactions.docs.append({"session_id": "cs_3", "user_id": "buyer", "order_id": "order-1", "payment_status": "pending"})
+    fake_db.orders.docs.append({"id": "order-1", "status": "created", "payment_status": "pending"})
+
+    assert asyncio.run(server.settle_payment("cs_3", "unpaid", "expired"))["payment_status"] == "failed"
+    assert fake_db.orders.docs[0]["status"] == "created"
@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import server
+
+CONTENT = b"campus store " * 100
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),           # open-ended
+    ("bytes=-100", (900, 999)),           # suffix
+    ("bytes=-5000", (0, 999)),            # suffix longer than the file
+    ("bytes=990-5000", (990, 999)),       # end clamped to the file
+    ("bytes=-", None),
+    ("bytes=0-1,5-6", None),              # multiple ranges are served whole
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert server.parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=20-10", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as exc:
+        server.parse_range(header, 1000)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == "bytes */1000"
+
+
+def test_accepted_encodings():
+    assert server.accepted_encodings("gzip;q=0.5, br;q=0, deflate") == {"gzip": 0.5, "br": 0.0, "deflate": 1.0}
+    assert server.accepted_encodings("") == {}
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "UPLOADS_DIR", tmp_path)
+    (tmp_path / "ab" / "cd").mkdir(parents=True)
+    (tmp_path / "ab" / "cd" / "abcd.txt").write_bytes(CONTENT)
+    (tmp_path / "ab" / "cd" / "abcd.txt.gz").write_bytes(gzip.compress(CONTENT))
+    (tmp_path / ".upload-1234.part").write_bytes(b"partial")
+    return TestClient(server.app)
+
+
+def test_precompressed_copy_has_its_own_etag(uploads):
+    identity = uploads.get("/api/uploads/ab/cd/abcd.txt", headers={"Accept-Encoding": "identity"})
+    encoded = uploads.get("/api/uploads/ab/cd/abcd.txt", headers={"Accept-Encoding": "gzip"})
+    assert identity.content == encoded.content == CONTENT
+    assert "content-encoding" not in identity.headers
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert identity.headers["etag"] == '"abcd"'
+    assert encoded.headers["etag"] == '"abcd-gzip"'
+
+    revalidated = uploads.get("/api/uploads/ab/cd/abcd.txt", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abcd"'})
+    assert revalidated.status_code == 200
+
+
+def test_refused_encoding_is_not_served(uploads):
+    response = uploads.get("/api/uploads/ab/cd/abcd.txt", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == CONTENT
+
+
+def test_range_request(uploads):
+    response = uploads.get("/api/uploads/ab/cd/abcd.txt", headers={"Range": "bytes=-13", "Accept-Encoding": "gzip"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-13:]
+    assert response.headers["content-range"] == f"bytes {len(CONTENT) - 13}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_dotfiles_are_not_served(uploads):
+    assert uploads.get("/api/uploads/.upload-1234.part").status_code == 404
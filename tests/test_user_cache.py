@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+class Clock:
+    """Stands in for server's time module with a monotonic clock the test advances"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = server.UserCache(ttl=30, max_entries=10)
+    cache.set("u1", {"id": "u1"})
+    clock.now += 29
+    assert cache.get("u1") == {"id": "u1"}
+    clock.now += 2
+    assert cache.get("u1") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = server.UserCache(ttl=30, max_entries=2)
+    cache.set("u1", {"id": "u1"})
+    cache.set("u2", {"id": "u2"})
+    cache.get("u1")
+    cache.set("u3", {"id": "u3"})
+    assert cache.get("u2") is None
+    assert cache.get("u1") == {"id": "u1"}
+    assert cache.get("u3") == {"id": "u3"}
+
+
+def test_revoke_and_restore(clock):
+    cache = server.UserCache(ttl=30, max_entries=10)
+    cache.set("u1", {"id": "u1"})
+    cache.revoke("u1")
+    assert cache.is_revoked("u1")
+    assert cache.get("u1") is None
+    cache.restore("u1")
+    assert not cache.is_revoked("u1")
+
+
+def test_revocation_expires_after_ttl(clock):
+    cache = server.UserCache(ttl=30, max_entries=10)
+    cache.revoke("u1")
+    clock.now += 31
+    assert not cache.is_revoked("u1")
+
+
+def test_restore_on_another_worker_is_seen_after_ttl(fake_db, clock):
+    token = server.create_token("u1", "college-1", server.UserRole.STUDENT.value)
+    fake_db.users.docs.append({"id": "u1", "status": server.UserStatus.ACTIVE.value})
+    server.user_cache.revoke("u1")  # Suspended here; another worker has since restored the account
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.authenticate_token(token))
+    assert exc.value.status_code == 403
+
+    clock.now += server.user_cache.ttl + 1
+    assert asyncio.run(server.authenticate_token(token))["id"] == "u1"
+
+
+def test_suspended_account_is_rejected_from_the_database(fake_db, clock):
+    token = server.create_token("u1", "college-1", server.UserRole.STUDENT.value)
+    fake_db.users.docs.append({"id": "u1", "status": server.UserStatus.SUSPENDED.value})
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.authenticate_token(token))
+    assert exc.value.status_code == 403